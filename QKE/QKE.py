@@ -11,43 +11,104 @@ from qiskit.tools.visualization import plot_histogram
 from qiskit_machine_learning.kernels import QuantumKernel
 from qiskit_machine_learning.datasets import ad_hoc_data
 from QKE_functions import *
+from packed_kernel import *
+from kernel_cache import *
+from streaming import *
+from quantum_svc import *
+from multiclass_kernel import *
+from phase_kernel import *
+from qiskit_pipeline import *
+from async_jobs import *
 from classicalSVM import *
 from data import *
 from qiskit import IBMQ
 
 
-def QKE(sample_train, sample_test, label_train, label_test, cross_fold, feature_dimension, map_type, reps):
+#Directory where kernel matrices are cached between runs, None disables the cache
+kernel_cache_directory = None
+#Simulate the 'z' and 'zz' feature maps with the statevector phase engine
+#instead of running the kernel circuits on a backend
+use_phase_engine = False
+#Evaluate the test kernel matrix only against the support vectors when
+#scoring without cross validation
+support_vectors_only = False
+#Rows of the test kernel matrix evaluated at a time when scoring without
+#cross validation, None evaluates the whole test kernel matrix at once
+test_chunk_size = None
+#Jobs submitted to a shot based backend at the same time
+max_jobs_in_flight = 4
+#Multi-class strategy, 'ovr' trains one-vs-rest SVMs on one shared kernel
+#matrix. None uses SVC directly, which is one-vs-one on slices of it
+multiclass_strategy = None
 
-    if map_type == 'zz':
-        map = ZZFeatureMap(feature_dimension, reps, entanglement="linear", insert_barriers=True)
-    else:
-        #map = PauliFeatureMap(feature_dimension, reps=reps, paulis=['Z', 'Y', 'ZZ'])
-        #map = RealAmplitudes(feature_dimension, entanglement="full", reps=2, insert_barriers=True)
-        map = ZFeatureMap(feature_dimension, reps, insert_barriers=True)
+def QKE(sample_train, sample_test, label_train, label_test, cross_fold, feature_dimension, map_type, reps):
 
     IBMQ.save_account('a38fb08449a69f7b683b17920cf77c6a22ebfa6a9fb4a1ca90b435720b1dff09200489b1372d40941db1ab58e8d1997be2806d659769e1c9e90360c38d958a3b', overwrite=True)
     IBMQ.load_account()
     provider = IBMQ.get_provider('ibm-q')
     qcomp = provider.get_backend('ibmq_manila')
 
-    #kernel = QuantumKernel(feature_map=map, quantum_instance=qcomp)
-    kernel = QuantumKernel(feature_map=map, quantum_instance=Aer.get_backend('statevector_simulator'))
-    
-    matrix_train = kernel.evaluate(x_vec=sample_train)
+    #backend = qcomp
+    backend = Aer.get_backend('statevector_simulator')
 
-    matrix_test = kernel.evaluate(x_vec=sample_test, y_vec=sample_train)
+    if use_phase_engine:
+        #Compute the statevectors of the diagonal feature map directly
+        kernel_function = lambda A, B: phase_kernel_matrix(A, B, reps, 'linear', map_type)
+        kernel_id = 'phase_engine'
+        #The states of the samples, so the support vectors are only simulated once
+        prepare = lambda X: phase_states(X, reps, 'linear', map_type)
+    else:
+        #The feature map is transpiled once for the backend and the samples are bound in batches,
+        #which are submitted as several jobs at once
+        kernel_function = lambda A, B: kernel_matrix_async(A, B, map_type, feature_dimension, reps, 'linear', backend,
+                                                           max_in_flight=max_jobs_in_flight)
+        kernel_id = 'qiskit/' + backend_name(backend)
+        prepare = None
+        if 'statevector' in backend_name(backend):
+            prepare = lambda X: feature_map_states(X, map_type, feature_dimension, reps, 'linear')
+    #Kernel matrix between two prepared sets if prepare is given
+    kernel_block = kernel_function if prepare is None else gram_from_states
+
+    if (test_chunk_size is not None or support_vectors_only) and cross_fold<=1:
+        #The test kernel matrix is evaluated chunk by chunk when scoring
+        matrix_train = kernel_function(sample_train, sample_train)
+        matrix_test = None
+    elif kernel_cache_directory is None:
+        matrix_train = kernel_function(sample_train, sample_train)
+
+        matrix_test = kernel_function(sample_test, sample_train)
+    else:
+        #Reuse the kernel matrices of an earlier run on the same samples
+        cache = KernelCache(kernel_cache_directory)
+        settings = {'map_type': map_type, 'reps': reps, 'n_qubits': feature_dimension, 'entanglement': 'linear'}
+        [matrix_train, matrix_test] = cache.kernel_matrices(sample_train, sample_test, kernel_function, kernel_id, settings)
 
-    zzpc_svc = SVC(kernel='precomputed') #Uses the precomputed kernel and calculates the SVM
+    if multiclass_strategy != 'ovr':
+        zzpc_svc = SVC(kernel='precomputed') #Uses the precomputed kernel and calculates the SVM
+    else:
+        #One binary SVM per class on the same kernel matrix
+        zzpc_svc = OneVsRestQSVC()
     
     #Plot the probabilites for the quantum states, circuit and kernel matrix 
-    plot_probabilities(sample_train, kernel)
-    plot_kernel(matrix_train, matrix_test)
-    plot_curcuit(sample_train, kernel)
+    plot_probabilities(sample_train, map_type, feature_dimension, reps)
+    if matrix_test is not None:
+        plot_kernel(matrix_train, matrix_test)
+    plot_curcuit(sample_train, map_type, feature_dimension, reps)
     #plt.show()
     if cross_fold<=1:
         #Calculates accuracy without cross validation
-        zzpc_svc.fit(matrix_train, label_train)
-        zzpc_score = zzpc_svc.score(matrix_test, label_test)
+        if support_vectors_only:
+            zzpc_svc = SupportVectorQSVC(kernel_block, chunk_size=test_chunk_size or 1000, prepare=prepare)
+            zzpc_svc.fit(sample_train, label_train, matrix_train)
+            zzpc_score = zzpc_svc.score(sample_test, label_test)
+            print("Support vectors: %0.1f%% of the training set" %(100*zzpc_svc.support_fraction_))
+        elif matrix_test is None:
+            zzpc_svc.fit(matrix_train, label_train)
+            zzpc_score = score_streaming(zzpc_svc, kernel_block, sample_test, label_test, sample_train, test_chunk_size,
+                                         prepare=prepare)
+        else:
+            zzpc_svc.fit(matrix_train, label_train)
+            zzpc_score = zzpc_svc.score(matrix_test, label_test)
         print("QKE accuracy: %0.3f\n" %(zzpc_score))
     else:
         #Calculates accuracy with cross validation, and presents mean and standard deviation
@@ -56,10 +117,12 @@ def QKE(sample_train, sample_test, label_train, label_test, cross_fold, feature_
         print(scores)
 
 
-def plot_probabilities(sample_train, kernel):
-    circuit = kernel.construct_circuit(sample_train[0], sample_train[1])
-    job = execute(circuit, Aer.get_backend('qasm_simulator'), shots = 8192, seed_simulator=1024, seed_transpiler=1024)
-    counts = job.result().get_counts(circuit)
+def plot_probabilities(sample_train, map_type, feature_dimension, reps):
+    backend = Aer.get_backend('qasm_simulator')
+    [circuit, x, y] = transpiled_kernel_circuit(map_type, feature_dimension, reps, 'linear', backend)
+    [circuit] = bind_kernel_circuits(circuit, x, y, [(sample_train[0], sample_train[1])])
+    job = backend.run(circuit, shots = 8192, seed_simulator=1024)
+    counts = job.result().get_counts()
     plot_histogram(counts)
     
 
@@ -72,8 +135,9 @@ def plot_kernel(matrix_train, matrix_test):
                     interpolation='nearest', origin='upper', cmap='Reds')
     axs[1].set_title("Testing kernel matrix")
 
-def plot_curcuit(sample_train, kernel):
-    circuit = kernel.construct_circuit(sample_train[0], sample_train[1])
+def plot_curcuit(sample_train, map_type, feature_dimension, reps):
+    [circuit, x, y] = kernel_circuit(map_type, feature_dimension, reps)
+    [circuit] = bind_kernel_circuits(circuit, x, y, [(sample_train[0], sample_train[1])])
     circuit.decompose().decompose().draw(output='mpl')
 
 def main():
@@ -87,6 +151,8 @@ def main():
 
     #Loading data from data.py file
     [sample_train, sample_test, label_train, label_test] = load_data_iris(100)
+    #All three classes, one-vs-one, or one-vs-rest with multiclass_strategy = 'ovr'
+    #[sample_train, sample_test, label_train, label_test] = load_data_iris(150, n_classes=3)
     #[sample_train, sample_test, label_train, label_test] = load_data_adhoc(50, 2)
     cross_fold_QKE=10
 
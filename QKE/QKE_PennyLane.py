@@ -7,6 +7,25 @@ from pennylane import numpy as np
 from pennylane.templates import AngleEmbedding, BasisEmbedding, AmplitudeEmbedding, IQPEmbedding
 from data import *
 from Functions import *
+from kernel_states import *
+from analytic_kernels import *
+from phase_kernel import *
+from packed_kernel import *
+from parallel_kernel import *
+from jax_kernel import *
+from kernel_cache import *
+from nystroem import *
+from streaming import *
+from quantum_svc import *
+from randomized_kernel import *
+from incremental_kernel import *
+from multiclass_kernel import *
+from multi_kernel import *
+from trainable_kernel import *
+from projected_kernel import *
+from dedup_kernel import *
+from circuit_optimization import *
+from cascade import *
 #from classicalSVM import *
 from qiskit import IBMQ
 import math
@@ -20,6 +39,50 @@ n_features = 4
 #If amplitude encoding, n_qubits = log_2(n_features)
 n_qubits = np.int64(np.ceil(np.log2(n_features))) if kernel_name == 'kernel_amplitude' else n_features
 n_wires = n_qubits
+#How the kernel matrices are computed:
+#'auto' uses closed forms and cached statevectors where possible, and simulates the circuit for every pair otherwise
+#'circuit' simulates the kernel circuit for every pair
+#'jax' simulates the kernel circuit for every pair with the jit compiled JAX backend
+kernel_backend = 'auto'
+#Precision of the statevectors and kernel matrices: ['float64', 'float32'].
+#'float32' stores complex64 states and float32 kernel matrices, and runs the
+#JAX backend in single precision
+kernel_precision = 'float64'
+#Amount of processes used for the pairwise kernel matrix, None uses all cores
+n_workers = 1
+#Directory where kernel matrices are cached between runs, None disables the cache
+kernel_cache_directory = None
+#Evaluate the test kernel matrix only against the support vectors when
+#scoring without cross validation
+support_vectors_only = False
+#Rows of the test kernel matrix evaluated at a time when scoring without
+#cross validation, None evaluates the whole test kernel matrix at once
+test_chunk_size = None
+#Amount of random measurement bases used to estimate the kernel from
+#randomized measurements on a shot based device, None computes the kernel
+#from the kernel circuits
+randomized_bases = None
+#Shots per sample and random basis
+randomized_shots = 1000
+#Amount of landmarks for the Nystroem approximation of the kernel, used for
+#large datasets like covtype. None computes the full kernel matrix
+nystroem_landmarks = None
+#How the landmarks are chosen: ['uniform', 'kmeans', 'leverage']
+landmark_method = 'uniform'
+#Amount of training samples arriving at a time, the kernel matrix is grown
+#incrementally and the SVM refitted after every batch. None trains on the
+#whole training set at once
+incremental_batch = None
+#Amount of newest samples kept when training incrementally, None keeps all
+incremental_window = None
+#Multi-class strategy, 'ovr' trains one-vs-rest SVMs on one shared kernel
+#matrix. None uses SVC directly, which is one-vs-one on slices of it
+multiclass_strategy = None
+#Kernels evaluated together in one pass over the data and combined by
+#multiple kernel learning, for example
+#['kernel_angle', 'kernel_IQP', 'kernel_zz', 'kernel_amplitude'].
+#None only runs kernel_name
+compare_kernels = None
 #Create the zero projector
 projector = np.zeros((2**n_qubits, 2**n_qubits))
 projector[0, 0] = 1
@@ -27,15 +90,88 @@ projector[0, 0] = 1
 provider = IBMQ.enable_account('a38fb08449a69f7b683b17920cf77c6a22ebfa6a9fb4a1ca90b435720b1dff09200489b1372d40941db1ab58e8d1997be2806d659769e1c9e90360c38d958a3b')
 #dev = qml.device('qiskit.ibmq', wires=n_wires, backend='ibmq_qasm_simulator', provider=provider)
 dev = qml.device("default.qubit", wires = n_wires)
+
+#Amount of times the angle and zz embeddings are repeated
+angle_layers = 2
+zz_layers = 2
+#Pairs of qubits entangled by kernel_zz: ['linear', 'circular', 'full']
+zz_entanglement = 'linear'
+zz_pairs = entangled_pairs(n_wires, zz_entanglement)
+#Layers of the trainable embedding of kernel_trainable, and its training on
+#the kernel target alignment of random batches of training samples
+trainable_layers = 2
+trainable_steps = 100
+trainable_batch_size = 8
+#Projected kernel of the single qubit reduced density matrices of the
+#embedding instead of the fidelity kernel, exp(-gamma sum_q |rho_q(x) - rho_q(y)|^2)
+projected_kernel = False
+projected_gamma = 1.0
+#Evaluate the kernel only between unique samples, after rounding them to
+#multiples of quantization_resolution if it is not None
+deduplicate_samples = False
+quantization_resolution = None
+#Cancel inverse gates, merge rotations and fuse single qubit gates in the
+#kernel circuits of the JAX backend, where the passes run once when the
+#circuit is traced. This pays off from about 8 qubits
+optimize_circuits = False
+#Classical margin thresholds of the classical-first cascade, test samples
+#with a smaller margin of the classical rbf SVM are classified with the
+#quantum kernel. The margin is |f(x)| of the binary SVMs, one-vs-one for
+#more classes, so 1 is the margin boundary. The cascade is evaluated for
+#every threshold, None skips it
+cascade_thresholds = None
+#Created by deduplicator() from the settings above
+deduplicated_kernel = None
+
+def embedding_angle(x):
+    """Angle encoding of the N-dimensional input data into N qubits."""
+    for i in range(angle_layers):
+        AngleEmbedding(x, wires=range(n_wires))
+
+def embedding_IQP(x):
+    """IQP encoding of the N-dimensional input data into N qubits."""
+    IQPEmbedding(x, wires=range(n_wires))
+
+def embedding_amplitude(x):
+    """Amplitude encoding of the N-dimensional input data into log(N) qubits."""
+    AmplitudeEmbedding(x, wires=range(n_wires), pad_with = 0, normalize=True)
+
+def embedding_basis(x):
+    """Basis encoding of the N binary input data into N qubits."""
+    BasisEmbedding(x, wires=range(n_wires))
+
+def embedding_trainable(x):
+    """Trainable embedding of kernel_trainable with its current parameters."""
+    trainable_embedding(x, trainable_kernel.params, range(n_wires))
+
+def embedding_angle_homemade(x):
+    """First half of kernel_angle_homemade, Hadamard and RZ rotations."""
+    wires = range(n_wires)
+    for i in wires:
+        qml.Hadamard(wires=[i])
+        qml.RZ(x[i], wires=[i])
+    for i in wires:
+        qml.Hadamard(wires=[i])
+        qml.RZ(x[i], wires=[i])
+
+def embedding_zz(x):
+    """First half of kernel_zz, a ZZ feature map on the pairs in zz_pairs."""
+    wires = range(n_wires)
+    for j in range(zz_layers):
+        for i in wires:
+            qml.Hadamard(wires=[i])
+            qml.RZ(2*x[i], wires=[i])
+        for a, b in zz_pairs:
+            qml.CNOT(wires=[a, b])
+            qml.RZ(2*((math.pi-x[a])*(math.pi-x[b])), wires=[b])
+            qml.CNOT(wires=[a, b])
+
 @qml.qnode(dev)
 def kernel_angle(x, y):
     """Kernel function with angle encoding. This circuit will rotate the 
         N-dimensional input data into N qubits. Input data can be floatnumbers."""
-    layers = 2
-    for i in range(layers):
-        AngleEmbedding(x, wires=range(n_wires))
-    for i in range(layers):
-        qml.adjoint(AngleEmbedding)(y, wires=range(n_wires))
+    embedding_angle(x)
+    qml.adjoint(embedding_angle)(y)
     return qml.expval(qml.Hermitian(projector, wires=range(n_wires)))
 
 @qml.qnode(dev)
@@ -50,8 +186,8 @@ def kernel_basis(x, y):
 def kernel_IQP(x, y):
     """Kernel function with IQP encoding. This circuit will encode N 
         input data into N qubits. Input data can only be floatnumbers."""
-    IQPEmbedding(x, wires=range(n_wires))
-    qml.adjoint(IQPEmbedding)(y, wires=range(n_wires))
+    embedding_IQP(x)
+    qml.adjoint(embedding_IQP)(y)
     return qml.expval(qml.Hermitian(projector, wires=range(n_wires)))
 
 @qml.qnode(dev)
@@ -59,11 +195,8 @@ def kernel_amplitude(x, y):
     """Kernel function with amplitude encoding. This circuit will encode the 
         N-dimensional input data into the amplitudes of log(N) qubits.
         Input data can be floatnumbers."""
-    layers = 1
-    for i in range(layers):
-        AmplitudeEmbedding(x, wires=range(n_wires), pad_with = 0, normalize=True)
-    for i in range(layers):
-        qml.adjoint(AmplitudeEmbedding)(y, wires=range(n_wires), pad_with = 0, normalize=True)
+    embedding_amplitude(x)
+    qml.adjoint(embedding_amplitude)(y)
     return qml.expval(qml.Hermitian(projector, wires=range(n_wires)))
 
 @qml.qnode(dev)
@@ -77,12 +210,7 @@ def featuremap_angle(x):
 @qml.qnode(dev)
 def kernel_angle_homemade(x, y):
     wires = range(n_wires)
-    for i in wires:
-        qml.Hadamard(wires=[i])
-        qml.RZ(x[i], wires=[i])
-    for i in wires:
-        qml.Hadamard(wires=[i])
-        qml.RZ(x[i], wires=[i])
+    embedding_angle_homemade(x)
     for i in wires:
         qml.RZ(y[i], wires=[i])
         qml.Hadamard(wires=[i])
@@ -94,24 +222,26 @@ def kernel_angle_homemade(x, y):
 @qml.qnode(dev)
 def kernel_zz(x, y):
     wires = range(n_wires)
-    layers = 2
-    for j in range(layers):
-        for i in wires:
-            qml.Hadamard(wires=[i])
-            qml.RZ(2*x[i], wires=[i])
-        qml.CNOT(wires=[0, 1])
-        qml.RZ(2*((math.pi-x[0])*(math.pi-x[1])), wires=[1])
-        qml.CNOT(wires=[0, 1])
-
-    for j in range(layers):
-        qml.CNOT(wires=[0, 1])
-        qml.RZ(2*((math.pi-y[0])*(math.pi-y[1])), wires=[1])
-        qml.CNOT(wires=[0, 1])
+    embedding_zz(x)
+    for j in range(zz_layers):
+        for a, b in reversed(zz_pairs):
+            qml.CNOT(wires=[a, b])
+            qml.RZ(2*((math.pi-y[a])*(math.pi-y[b])), wires=[b])
+            qml.CNOT(wires=[a, b])
         for i in wires:
             qml.RZ(2*y[i], wires=[i])
             qml.Hadamard(wires=[i])
     
     return qml.expval(qml.Hermitian(projector, wires=range(n_wires)))
+
+#Embedding with trainable parameters, trained in main before the kernel
+#matrices are computed
+trainable_kernel = TrainableKernel(n_wires, trainable_layers, dev, seed=0)
+
+def kernel_trainable(x, y):
+    """Kernel function with the trainable embedding. x and y can be
+        batches of samples, which are run in one execution."""
+    return trainable_kernel.pair_kernel(x, y)
 '''
 @qml.qnode(dev)
 def kernel_angle_homemade(x ,y):
@@ -120,10 +250,182 @@ def kernel_angle_homemade(x ,y):
     return qml.expval(qml.Hermitian(projector, wires=range(n_wires)))
 '''
 
+@qml.qnode(dev)
+def state_angle(x):
+    embedding_angle(x)
+    return qml.state()
+
+@qml.qnode(dev)
+def state_IQP(x):
+    embedding_IQP(x)
+    return qml.state()
+
+@qml.qnode(dev)
+def state_amplitude(x):
+    embedding_amplitude(x)
+    return qml.state()
+
+@qml.qnode(dev)
+def state_angle_homemade(x):
+    embedding_angle_homemade(x)
+    return qml.state()
+
+@qml.qnode(dev)
+def state_zz(x):
+    embedding_zz(x)
+    return qml.state()
+
+def iqp_states(X):
+    """States of kernel_IQP from the phase engine, which like IQPEmbedding
+       needs one feature per wire."""
+    X = np.asarray(X)
+    if X.shape[1] != n_wires:
+        raise ValueError("Features must be of length %d; got length %d." % (n_wires, X.shape[1]))
+    return phase_states(X, 1, 'full', 'iqp', kernel_precision)
+
+#Kernels that only depend on the embedded states, with a function preparing
+#the states of a set of samples and whether the overlap is taken with the
+#conjugate of the second state. kernel_angle_homemade and kernel_zz undo the
+#embedding with the transpose instead of the adjoint, so their overlap is not
+#conjugated. The diagonal IQP and ZZ feature maps are computed by the phase
+#engine instead of simulating the circuits. embedding_zz only reads the
+#first n_wires features, the phase engine has one qubit per feature.
+state_kernels = {
+    'kernel_angle': (lambda X: embedding_states(X, state_angle, kernel_precision), True),
+    'kernel_IQP': (iqp_states, True),
+    'kernel_amplitude': (lambda X: embedding_states(X, state_amplitude, kernel_precision), True),
+    'kernel_angle_homemade': (lambda X: embedding_states(X, state_angle_homemade, kernel_precision), False),
+    'kernel_zz': (lambda X: phase_states(np.asarray(X)[:, :n_wires], zz_layers, zz_pairs, 'zz', kernel_precision), False),
+    'kernel_trainable': (lambda X: trainable_kernel.states(X).astype(precision_dtypes[kernel_precision][0]), True),
+}
+
+#Embeddings U(x) of the kernels, used to measure the embedded samples
+embeddings = {
+    'kernel_angle': embedding_angle,
+    'kernel_IQP': embedding_IQP,
+    'kernel_amplitude': embedding_amplitude,
+    'kernel_basis': embedding_basis,
+    'kernel_angle_homemade': embedding_angle_homemade,
+    'kernel_zz': embedding_zz,
+    'kernel_trainable': embedding_trainable,
+}
+
+#Fidelity kernels k(x, y) = |<0|U^dagger(y)U(x)|0>|^2, which randomized
+#measurements estimate. kernel_angle_homemade and kernel_zz undo the
+#embedding with the transpose and are not of this form
+fidelity_kernels = ['kernel_angle', 'kernel_IQP', 'kernel_amplitude', 'kernel_basis', 'kernel_trainable']
+
+#Kernels with a closed form, computed with numpy instead of simulating the circuits
+analytic_kernels = {
+    'kernel_angle': lambda A, B: angle_kernel_matrix(A, B, angle_layers, n_wires=n_wires),
+    'kernel_amplitude': lambda A, B: amplitude_kernel_matrix(A, B, n_wires),
+    'kernel_basis': lambda A, B: basis_kernel_matrix(A, B, n_wires),
+}
+
+#Kernels with the value 1 on the diagonal, k(x, x) = 1
+unit_diagonal_kernels = ['kernel_angle', 'kernel_basis', 'kernel_IQP', 'kernel_amplitude', 'kernel_trainable']
+
+#Version of the kernel circuits in the cache key, increased when a circuit
+#changes so kernel matrices cached with the old circuit are not reused.
+#Version 1 of kernel_zz only entangled the first pair of qubits
+kernel_versions = {'kernel_zz': 2}
+
+def projected_features(samples, kernel_function):
+    """Single qubit Pauli expectations of the embedded samples, from the
+       states of state based kernels or measured on dev. The phase engine
+       numbers the qubits in reverse, which the kernel, a sum over the
+       qubits, does not depend on."""
+    name = kernel_function.__name__
+    if kernel_backend == 'auto' and name in state_kernels:
+        return pauli_expectations(state_kernels[name][0](samples))
+    return measured_pauli_expectations(samples, embeddings[name], range(n_wires), dev)
+
+def deduplicator():
+    """DeduplicatedKernel with the current quantization_resolution. It
+       keeps counting the kernel entries until the resolution changes."""
+    global deduplicated_kernel
+    if deduplicated_kernel is None or deduplicated_kernel.resolution != quantization_resolution:
+        deduplicated_kernel = DeduplicatedKernel(quantization_resolution)
+    return deduplicated_kernel
+
 def kernel_matrix(A, B, kernel_function):
     """Compute the matrix whose entries are the kernel
-       evaluated on pairwise data from sets A and B."""
-    return np.array([[kernel_function(a, b) for b in B] for a in A])
+       evaluated on pairwise data from sets A and B.
+       With deduplicate_samples only the unique samples are evaluated."""
+    if deduplicate_samples:
+        return deduplicator()(A, B, lambda A, B: evaluate_kernel_matrix(A, B, kernel_function))
+    return evaluate_kernel_matrix(A, B, kernel_function)
+
+def evaluate_kernel_matrix(A, B, kernel_function):
+    """Kernels with a closed form are computed with numpy.
+       Otherwise, if B is A only the upper triangle is evaluated
+       and a PackedKernelMatrix is returned."""
+    if projected_kernel:
+        #Every sample is embedded once, the kernel follows from the Pauli expectations
+        features_A = projected_features(A, kernel_function)
+        features_B = features_A if B is A else projected_features(B, kernel_function)
+        return projected_kernel_matrix(features_A, features_B, projected_gamma, kernel_precision)
+    if kernel_backend == 'auto' and kernel_function.__name__ in analytic_kernels:
+        return analytic_kernels[kernel_function.__name__](A, B).astype(precision_dtypes[kernel_precision][1], copy=False)
+    if kernel_backend == 'auto' and kernel_function.__name__ in state_kernels:
+        #Simulate every sample once and build the matrix from the states
+        state_function, conjugate = state_kernels[kernel_function.__name__]
+        states_A = state_function(A)
+        if B is A:
+            return packed_gram_from_states(states_A, conjugate)
+        return gram_from_states(states_A, state_function(B), conjugate)
+    unit_diagonal = kernel_function.__name__ in unit_diagonal_kernels
+    if (kernel_backend == 'jax' or n_workers != 1) and not isinstance(kernel_function, qml.QNode):
+        #The JAX backend and the worker processes rebuild the QNode on their own device
+        raise ValueError("%s is not a QNode, it can not run with kernel_backend = 'jax' or n_workers != 1"
+                         % kernel_function.__name__)
+    if kernel_backend == 'jax':
+        return jax_kernel_matrix(A, B, kernel_function, precision=kernel_precision, unit_diagonal=unit_diagonal, optimize=optimize_circuits)
+    if n_workers != 1:
+        return kernel_matrix_parallel(A, B, kernel_function, n_workers, unit_diagonal=unit_diagonal)
+    dtype = precision_dtypes[kernel_precision][1]
+    if B is A:
+        matrix = packed_kernel_matrix(A, kernel_function, unit_diagonal)
+        matrix.upper = matrix.upper.astype(dtype, copy=False)
+        return matrix
+    return np.array([[kernel_function(a, b) for b in B] for a in A], dtype=dtype)
+
+def kernel_parts(kernel_function):
+    """The kernel as (prepare, block) for multi_kernel_matrices, where
+       prepare(X) is the per sample part, the states for state based kernels,
+       and block computes the kernel matrix between two prepared sets.
+       Deduplicated kernels are computed by kernel_matrix on the samples."""
+    name = kernel_function.__name__
+    if deduplicate_samples:
+        return (lambda X: X, lambda A, B: kernel_matrix(A, B, kernel_function))
+    if projected_kernel:
+        return (lambda X: projected_features(X, kernel_function),
+                lambda features_A, features_B: projected_kernel_matrix(features_A, features_B, projected_gamma, kernel_precision))
+    if kernel_backend == 'auto' and name in analytic_kernels:
+        return (lambda X: X, lambda A, B: analytic_kernels[name](A, B).astype(precision_dtypes[kernel_precision][1], copy=False))
+    if kernel_backend == 'auto' and name in state_kernels:
+        state_function, conjugate = state_kernels[name]
+        return (state_function, lambda states_A, states_B: gram_from_states(states_A, states_B, conjugate))
+    return (lambda X: X, lambda A, B: kernel_matrix(A, B, kernel_function))
+
+def kernel_matrices(sample_train, sample_test, kernel_function):
+    """Compute the train and test kernel matrices. State based kernels
+       simulate the union of the samples once."""
+    name = kernel_function.__name__
+    if deduplicate_samples:
+        return kernel_matrix(sample_train, sample_train, kernel_function), kernel_matrix(sample_test, sample_train, kernel_function)
+    if projected_kernel:
+        features = projected_features(np.concatenate((sample_train, sample_test)), kernel_function)
+        features_train = features[:len(sample_train)]
+        matrix_train = projected_kernel_matrix(features_train, features_train, projected_gamma, kernel_precision)
+        matrix_test = projected_kernel_matrix(features[len(sample_train):], features_train, projected_gamma, kernel_precision)
+        return matrix_train, matrix_test
+    if kernel_backend == 'auto' and name in state_kernels and name not in analytic_kernels:
+        state_function, conjugate = state_kernels[name]
+        return gram_train_test(sample_train, sample_test, state_function, conjugate)
+    matrix_train = kernel_matrix(sample_train, sample_train, kernel_function)
+    matrix_test = kernel_matrix(sample_test, sample_train, kernel_function)
+    return matrix_train, matrix_test
 
 def main():
     
@@ -152,6 +454,8 @@ def main():
     #print(qml.draw(featuremap_angle)(sample_train, sample_test))
 
     #[sample_train, sample_test, label_train, label_test] = load_data_forest(100, 54)
+    #All seven classes, one-vs-one, or one-vs-rest with multiclass_strategy = 'ovr'
+    #[sample_train, sample_test, label_train, label_test] = load_data_forest(100, 54, n_classes=7)
     #Scale the data
     '''
     [sample_train, sample_test] = scale(sample_train, sample_test, -1, 1)
@@ -167,25 +471,134 @@ def main():
         kernel_function = kernel_IQP
     elif kernel_name == 'kernel_angle_homemade':
         kernel_function = kernel_angle_homemade
+    elif kernel_name == 'kernel_trainable':
+        kernel_function = kernel_trainable
     else:
         kernel_function =  kernel_amplitude
 
+    if kernel_name == 'kernel_trainable' or (compare_kernels is not None and 'kernel_trainable' in compare_kernels):
+        #Train the embedding, every step only runs the pairs of one batch of samples
+        alignments = trainable_kernel.fit(sample_train, label_train, trainable_steps, trainable_batch_size)
+        print("Kernel target alignment of the batches: %0.3f in the first steps, %0.3f in the last steps"
+              % (np.mean(alignments[:10]), np.mean(alignments[-10:])))
+
     #Amount of parts the data is divided into for cross validation
     #The runtime will be increased by a factor of this number roughly
     #if crossfold<=1 no cross validation is done
     cross_fold = 10
 
+    if compare_kernels is not None:
+        #All kernel matrices in one pass, combined with weights learned from the training labels
+        kernels = {name: kernel_parts(globals()[name]) for name in compare_kernels}
+        [matrices_train, matrices_test] = multi_kernel_train_test(sample_train, sample_test, kernels)
+        for name in compare_kernels:
+            score = SVC(kernel='precomputed').fit(matrices_train[name], label_train).score(matrices_test[name], label_test)
+            print("%s accuracy: %0.3f, alignment: %0.3f" % (name, score, alignment(matrices_train[name], label_train)))
+        weights = alignment_weights([matrices_train[name] for name in compare_kernels], label_train)
+        matrix_train = combine_kernels([matrices_train[name] for name in compare_kernels], weights)
+        matrix_test = combine_kernels([matrices_test[name] for name in compare_kernels], weights)
+        score = SVC(kernel='precomputed').fit(matrix_train, label_train).score(matrix_test, label_test)
+        print("Combined accuracy: %0.3f, weights: %s\n" % (score, ', '.join('%0.2f' % w for w in weights)))
+        return
+
+    if nystroem_landmarks is not None:
+        #Linear SVM on Nystroem features, only the kernel against the landmarks is evaluated
+        kernel = lambda A, B: kernel_matrix(A, B, kernel_function)
+        qsvm = nystroem_svm(kernel, nystroem_landmarks, landmark_method)
+        if cross_fold<=1:
+            qsvm.fit(sample_train, label_train)
+            score = qsvm.score(sample_test, label_test)
+            print("QKE Nystroem accuracy: %0.3f, Landmarks: %d\n" %(score, nystroem_landmarks))
+        else:
+            scores_cross=cross_val_score(qsvm,sample_train,label_train, cv=cross_fold)
+            print("QKE Nystroem accuracy: %0.3f ± %0.3f, Cross_fold ammount: %0.1f, Landmarks: %d\n" % (scores_cross.mean(), scores_cross.std(), cross_fold, nystroem_landmarks))
+        return
+
+    if incremental_batch is not None:
+        #Simulate training samples arriving over time
+        if kernel_backend == 'auto' and kernel_name in state_kernels:
+            state_function, conjugate = state_kernels[kernel_name]
+            store = IncrementalKernelStore(state_function, conjugate, window=incremental_window)
+        else:
+            kernel = lambda A, B: kernel_matrix(A, B, kernel_function)
+            store = IncrementalKernelStore(kernel=kernel, window=incremental_window)
+        for start in range(0, len(sample_train), incremental_batch):
+            store.append(sample_train[start:start + incremental_batch], label_train[start:start + incremental_batch])
+            store.fit()
+            print("%d training samples, %d kernel entries evaluated, accuracy: %0.3f"
+                  % (store.n, store.entries_evaluated, store.score(sample_test, label_test)))
+        return
+
+    if cascade_thresholds is not None:
+        #Only the uncertain test samples are evaluated against the quantum support vectors,
+        #which are prepared once
+        [prepare, block] = kernel_parts(kernel_function)
+        matrix_train = kernel_matrix(sample_train, sample_train, kernel_function)
+        cascade = CascadeQSVC(block, SVC(kernel='rbf', C=10), chunk_size=test_chunk_size or 1000, prepare=prepare)
+        cascade.fit(sample_train, label_train, matrix_train)
+        for row in cascade_report(cascade, sample_test, label_test, cascade_thresholds):
+            print("Threshold %0.2f: %0.1f%% routed to the quantum kernel, accuracy: %0.3f, %0.2f ms per sample"
+                  % (row['threshold'], 100*row['routed'], row['accuracy'], 1000*row['time_per_sample']))
+        return
+
     #Calculate the kernel matrices
-    matrix_train = kernel_matrix(sample_train, sample_train, kernel_function)
-    matrix_test = kernel_matrix(sample_test, sample_train, kernel_function)
+    if randomized_bases is not None:
+        if kernel_name not in fidelity_kernels:
+            raise ValueError("Randomized measurements only estimate the fidelity kernels %s, not %s"
+                             % (', '.join(fidelity_kernels), kernel_name))
+        #Run only the embedding of every sample in random bases on dev
+        [matrix_train, matrix_test] = randomized_kernel_matrices(sample_train, sample_test,
+            embeddings[kernel_name], range(n_wires), randomized_bases, randomized_shots, dev)
+    elif (test_chunk_size is not None or support_vectors_only) and cross_fold<=1:
+        #The test kernel matrix is evaluated chunk by chunk when scoring
+        matrix_train = kernel_matrix(sample_train, sample_train, kernel_function)
+        matrix_test = None
+    elif kernel_cache_directory is None:
+        [matrix_train, matrix_test] = kernel_matrices(sample_train, sample_test, kernel_function)
+    else:
+        #Reuse the kernel matrices of an earlier run on the same samples
+        cache = KernelCache(kernel_cache_directory)
+        settings = {'angle_layers': angle_layers, 'zz_layers': zz_layers, 'zz_pairs': zz_pairs, 'n_qubits': n_qubits,
+                    'precision': kernel_precision, 'version': kernel_versions.get(kernel_name, 1)}
+        #The rows are hashed before quantizing, quantized kernels are stored separately
+        settings['deduplicate_samples'] = deduplicate_samples
+        settings['quantization_resolution'] = quantization_resolution
+        if projected_kernel:
+            settings['projected_gamma'] = projected_gamma
+        if kernel_name == 'kernel_trainable':
+            settings['trainable_parameters'] = np.asarray(trainable_kernel.params).tolist()
+        [prepare, block] = kernel_parts(kernel_function)
+        [matrix_train, matrix_test] = cache.kernel_matrices(sample_train, sample_test, block, kernel_name, settings,
+                                                            precision_dtypes[kernel_precision][1], prepare)
+
+    if deduplicate_samples:
+        deduplication = deduplicator()
+        print("Unique samples: %d of %d kernel entries evaluated, compression %0.1fx"
+              % (deduplication.entries_evaluated, deduplication.entries_total, deduplication.compression))
 
     #Calculate the SVM classically with the Quantum Kernel
-    qsvm = SVC(kernel='precomputed')
+    if multiclass_strategy != 'ovr':
+        qsvm = SVC(kernel='precomputed')
+    else:
+        #One binary SVM per class on the same kernel matrix
+        qsvm = OneVsRestQSVC()
     #print(qml.draw(kernel_angle)([1, 2, 3, 4], [3, 4, 5, 6], [1, 2, 3, 4], [3, 4, 5, 6]))
     if cross_fold<=1:
         #Calculates accuracy without cross validation
-        qsvm.fit(matrix_train, label_train)
-        score = qsvm.score(matrix_test, label_test)
+        #The training samples or support vectors are prepared once, every
+        #chunk of test samples only simulates its own samples
+        [prepare, block] = kernel_parts(kernel_function)
+        if support_vectors_only:
+            qsvm = SupportVectorQSVC(block, chunk_size=test_chunk_size or 1000, prepare=prepare)
+            qsvm.fit(sample_train, label_train, matrix_train)
+            score = qsvm.score(sample_test, label_test)
+            print("Support vectors: %0.1f%% of the training set" %(100*qsvm.support_fraction_))
+        elif matrix_test is None:
+            qsvm.fit(matrix_train, label_train)
+            score = score_streaming(qsvm, block, sample_test, label_test, sample_train, test_chunk_size, prepare=prepare)
+        else:
+            qsvm.fit(matrix_train, label_train)
+            score = qsvm.score(matrix_test, label_test)
         print("QKE accuracy: %0.3f\n" %(score))
     else:
         #Calculates accuracy with cross validation, and presents mean and standard deviation
@@ -17,6 +17,10 @@ from qiskit.tools.visualization import circuit_drawer
 from urllib3 import encode_multipart_formdata
 from qiskit_machine_learning.kernels import QuantumKernel
 from Functions import *
+from kernel_states import *
+from phase_kernel import *
+from adaptive_shots import *
+from qiskit_pipeline import zero_counts
 from qiskit_machine_learning.datasets import ad_hoc_data
 from qiskit.utils import QuantumInstance, algorithm_globals
 from qiskit_machine_learning.algorithms import QSVC
@@ -43,8 +47,49 @@ adhoc_backend = QuantumInstance(
 
 adhoc_kernel = QuantumKernel(feature_map=adhoc_feature_map, quantum_instance=adhoc_backend)
 
-adhoc_matrix_train = adhoc_kernel.evaluate(x_vec=train_features)
-adhoc_matrix_test = adhoc_kernel.evaluate(x_vec=test_features, y_vec=train_features)
+#Emulate the shots of the qasm simulator from exact statevector kernels
+#instead of simulating every kernel circuit
+shot_emulation = False
+
+if shot_emulation:
+    shot_rng = np.random.default_rng(seed)
+    adhoc_matrix_train = emulate_shots(phase_kernel_matrix(train_features, train_features, 2, "linear", "zz"), 1024, shot_rng)
+    adhoc_matrix_test = emulate_shots(phase_kernel_matrix(test_features, train_features, 2, "linear", "zz"), 1024, shot_rng)
+else:
+    adhoc_matrix_train = adhoc_kernel.evaluate(x_vec=train_features)
+    adhoc_matrix_test = adhoc_kernel.evaluate(x_vec=test_features, y_vec=train_features)
+
+#Spend the shots of the training kernel matrix adaptively, on average
+#adaptive_budget shots per entry, on the entries with the highest variance
+#or the largest influence on the SVM margin
+adaptive_shots = False
+adaptive_budget = 512
+adaptive_strategy = 'variance'
+
+if adaptive_shots:
+    exact_matrix_train = phase_kernel_matrix(train_features, train_features, 2, "linear", "zz")
+    if shot_emulation:
+        sampler = binomial_sampler(exact_matrix_train, seed)
+    else:
+        qasm_backend = BasicAer.get_backend("qasm_simulator")
+        sampler = lambda rows, cols, shots: zero_counts(train_features, train_features, rows, cols, "zz",
+                                                        adhoc_dimension, 2, "linear", qasm_backend, shots)
+    n_entries = len(train_features)*(len(train_features) - 1)//2
+    adhoc_matrix_train, entry_shots = adaptive_kernel_matrix(sampler, len(train_features), adaptive_budget*n_entries,
+                                                             strategy=adaptive_strategy, labels=train_labels)
+    report = shot_report(adhoc_matrix_train, entry_shots, exact_matrix_train)
+    print("Adaptive shots: %d in total, kernel RMSE %0.4f" % (report['shots'], report['rmse']))
+    print("Fixed shots for the same RMSE: %0.0f per entry, %0.0f in total (%0.1f%% saved)"
+          % (report['fixed_shots_per_entry'], report['fixed_shots'], 100*report['saving']))
+    #A smaller kernel error does not have to give a better SVM, so compare the accuracy as well
+    report = accuracy_report(adhoc_matrix_train, entry_shots, sampler, train_labels, adhoc_matrix_test, test_labels)
+    for fixed_shots, accuracy in report['fixed_accuracies'].items():
+        print("Fixed shots %d per entry: accuracy %0.3f" % (fixed_shots, accuracy))
+    if report['matching_shots'] is None:
+        print("Adaptive shots: accuracy %0.3f, not reached with fixed shots" % report['accuracy'])
+    else:
+        print("Adaptive shots: accuracy %0.3f, reached with %d fixed shots per entry, %d in total (%0.1f%% saved)"
+              % (report['accuracy'], report['matching_shots_per_entry'], report['matching_shots'], 100*report['saving']))
 
 adhoc_svc = SVC(kernel="precomputed")
 adhoc_svc.fit(adhoc_matrix_train, train_labels)
@@ -18,6 +18,9 @@ from qiskit.tools.visualization import circuit_drawer
 from urllib3 import encode_multipart_formdata
 from qiskit_machine_learning.kernels import QuantumKernel
 from Functions import *
+from kernel_states import *
+from phase_kernel import *
+from lazy_kernel import *
 from qiskit_machine_learning.datasets import ad_hoc_data
 from qiskit.utils import QuantumInstance, algorithm_globals
 from qiskit_machine_learning.algorithms import QSVC
@@ -50,8 +53,24 @@ adhoc_score = adhoc_svc.score(test_features, test_labels)
 
 print(f"Callable kernel classification test score: {adhoc_score}")
 
-adhoc_matrix_train = adhoc_kernel.evaluate(x_vec=train_features)
-adhoc_matrix_test = adhoc_kernel.evaluate(x_vec=test_features, y_vec=train_features)
+#Only the kernel rows requested by the SMO solver are evaluated
+adhoc_lazy_svc = LazyQSVC(lambda A, B: adhoc_kernel.evaluate(x_vec=A, y_vec=B), cache_rows=16)
+adhoc_lazy_svc.fit(train_features, train_labels)
+adhoc_score = adhoc_lazy_svc.score(test_features, test_labels)
+
+print(f"Lazy kernel classification test score: {adhoc_score}, kernel rows evaluated: {adhoc_lazy_svc.rows_evaluated_}")
+
+#Emulate the shots of the qasm simulator from exact statevector kernels
+#instead of simulating every kernel circuit
+shot_emulation = False
+
+if shot_emulation:
+    shot_rng = np.random.default_rng(seed)
+    adhoc_matrix_train = emulate_shots(phase_kernel_matrix(train_features, train_features, 2, "linear", "zz"), 1024, shot_rng)
+    adhoc_matrix_test = emulate_shots(phase_kernel_matrix(test_features, train_features, 2, "linear", "zz"), 1024, shot_rng)
+else:
+    adhoc_matrix_train = adhoc_kernel.evaluate(x_vec=train_features)
+    adhoc_matrix_test = adhoc_kernel.evaluate(x_vec=test_features, y_vec=train_features)
 
 adhoc_svc = SVC(kernel="precomputed")
 adhoc_svc.fit(adhoc_matrix_train, train_labels)
@@ -0,0 +1,115 @@
+import numpy as np
+from sklearn.svm import SVC
+from packed_kernel import PackedKernelMatrix
+
+#A kernel entry is the probability p of measuring all zeros, estimated from
+#s shots with variance p(1-p)/s. Entries close to 0 or 1 need few shots, so
+#instead of giving every entry the same amount of shots, every entry of the
+#strict upper triangle gets a small initial batch and the rest of the budget
+#is spent in rounds on the entries where more shots reduce the error most:
+#the highest variance, or the largest influence on the SVM margin.
+
+def binomial_sampler(matrix, seed=None):
+    """Sampler drawing the all zero counts from the exact kernel matrix,
+       for emulating a shot based backend."""
+    rng = np.random.default_rng(seed)
+    def sampler(rows, cols, shots):
+        return rng.binomial(shots, np.clip(matrix[rows, cols], 0, 1))
+    return sampler
+
+def margin_weights(matrix, labels, C=1.0, floor=0.05):
+    """Influence of every entry (i, j) on the decision function of an SVC
+       fitted on the kernel matrix, |alpha_i| + |alpha_j| scaled to at most
+       1. Entries between two non support vectors keep the weight floor."""
+    svc = SVC(kernel='precomputed', C=C).fit(np.asarray(matrix), labels)
+    alpha = np.zeros(len(labels))
+    alpha[svc.support_] = np.abs(svc.dual_coef_).sum(axis=0)
+    rows, cols = np.triu_indices(len(labels), k=1)
+    weights = alpha[rows] + alpha[cols]
+    if weights.max() > 0:
+        weights = weights/weights.max()
+    return np.maximum(weights, floor)
+
+def adaptive_kernel_matrix(sampler, n, budget, initial_shots=32, round_shots=64, round_fraction=0.1,
+                           strategy='variance', labels=None, C=1.0, refit_every=5):
+    """Estimate the kernel matrix of n samples with themselves with at most
+       budget shots in total. sampler(rows, cols, shots) runs the pairs
+       (rows[k], cols[k]) with shots each and returns the all zero counts.
+       Every round gives round_shots more to the round_fraction of entries
+       with the largest expected reduction of the (weighted) squared error.
+       strategy 'margin' weighs the entries by margin_weights, refitted every
+       refit_every rounds, and needs the labels. Returns the estimate as a
+       PackedKernelMatrix and the shots spent on every packed entry."""
+    if strategy not in ('variance', 'margin'):
+        raise ValueError("Unknown strategy %s, use 'variance' or 'margin'" % strategy)
+    if strategy == 'margin' and labels is None:
+        raise ValueError("The margin strategy needs the labels")
+    rows, cols = np.triu_indices(n, k=1)
+    n_entries = len(rows)
+    if budget < initial_shots*n_entries:
+        raise ValueError("A budget of %d shots is less than the initial %d shots per entry" % (budget, initial_shots))
+
+    hits = np.asarray(sampler(rows, cols, initial_shots), dtype=float)
+    shots = np.full(n_entries, initial_shots)
+    used = initial_shots*n_entries
+    weights = np.ones(n_entries)
+    per_round = max(1, int(round_fraction*n_entries))
+    iteration = 0
+    while used + round_shots <= budget:
+        if strategy == 'margin' and iteration % refit_every == 0:
+            weights = margin_weights(PackedKernelMatrix(n, hits/shots), labels, C)**2
+        #Posterior mean of p, so entries measured as exactly 0 or 1 keep
+        #a nonzero variance
+        p = (hits + 1)/(shots + 2)
+        gain = weights*p*(1 - p)*(1/shots - 1/(shots + round_shots))
+        k = min(per_round, (budget - used)//round_shots)
+        chosen = np.argpartition(-gain, k - 1)[:k]
+        hits[chosen] += sampler(rows[chosen], cols[chosen], round_shots)
+        shots[chosen] += round_shots
+        used += k*round_shots
+        iteration += 1
+    return PackedKernelMatrix(n, hits/shots), shots
+
+def shot_report(estimate, shots, exact):
+    """Compare the shots spent on the estimate with the fixed amount of
+       shots per entry giving the same mean squared error, which is
+       mean(p(1-p))/s for s shots per entry."""
+    rows, cols = np.triu_indices(estimate.n, k=1)
+    p = np.asarray(exact[rows, cols])
+    mse = np.mean((estimate.upper - p)**2)
+    fixed_shots = np.mean(p*(1 - p))/mse
+    return {'shots': int(shots.sum()),
+            'rmse': np.sqrt(mse),
+            'fixed_shots_per_entry': fixed_shots,
+            'fixed_shots': fixed_shots*len(p),
+            'saving': 1 - shots.sum()/(fixed_shots*len(p))}
+
+def accuracy_report(estimate, shots, sampler, labels, matrix_test, labels_test,
+                    fixed_shots_per_entry=(64, 128, 256, 512, 1024, 2048), C=1.0, repeats=3):
+    """Compare the test accuracy of an SVC fitted on the estimate with SVCs
+       fitted on estimates with a fixed amount of shots per entry, drawn
+       repeats times from sampler for every amount in fixed_shots_per_entry.
+       matrix_test is the kernel matrix between the test and training
+       samples. The matching fixed amount is the smallest one reaching the
+       accuracy of the estimate on average, None if none of them does."""
+    n = estimate.n
+    rows, cols = np.triu_indices(n, k=1)
+    score = lambda matrix: SVC(kernel='precomputed', C=C).fit(np.asarray(matrix), labels).score(matrix_test, labels_test)
+    accuracy = score(estimate)
+    fixed_accuracies = {}
+    matching = None
+    for fixed_shots in sorted(fixed_shots_per_entry):
+        fixed_accuracies[fixed_shots] = float(np.mean([score(PackedKernelMatrix(n, sampler(rows, cols, fixed_shots)/fixed_shots))
+                                                       for repeat in range(repeats)]))
+        if matching is None and fixed_accuracies[fixed_shots] >= accuracy:
+            matching = fixed_shots
+    report = {'shots': int(shots.sum()),
+              'accuracy': accuracy,
+              'fixed_accuracies': fixed_accuracies,
+              'matching_shots_per_entry': matching,
+              'matching_shots': None,
+              'saving': None}
+    if matching is not None:
+        report['matching_shots'] = matching*len(rows)
+        report['saving'] = 1 - shots.sum()/(matching*len(rows))
+    return report
@@ -0,0 +1,44 @@
+import numpy as np
+
+#Closed forms of kernels whose circuits can be simulated classically in a
+#few vectorized numpy operations. They give the same kernel matrices as the
+#circuit simulation, up to numerical precision. Given the amount of wires
+#they reject the samples the embeddings reject, with the same ValueError.
+
+def angle_kernel_matrix(A, B, layers=2, chunk_size=256, n_wires=None):
+    """Kernel matrix of the unentangled angle encoding, where every feature
+       is rotated layers times with RX. Each qubit contributes a factor
+       |<0|RX(-layers*y)RX(layers*x)|0>|^2 = cos^2(layers*(x - y)/2)."""
+    A = np.asarray(A, dtype=float)
+    B = np.asarray(B, dtype=float)
+    if n_wires is not None and A.shape[1] > n_wires:
+        raise ValueError("Features must be of length %d or less; got length %d." % (n_wires, A.shape[1]))
+    matrix = np.empty((len(A), len(B)))
+    for start in range(0, len(A), chunk_size):
+        difference = A[start:start + chunk_size, None, :] - B[None, :, :]
+        matrix[start:start + chunk_size] = np.prod(np.cos(layers*difference/2)**2, axis=2)
+    return matrix
+
+def amplitude_kernel_matrix(A, B, n_wires=None):
+    """Kernel matrix of the amplitude encoding, the squared overlap of the
+       normalized vectors. Padding with zeros does not change the overlap."""
+    A = np.asarray(A, dtype=float)
+    B = np.asarray(B, dtype=float)
+    if n_wires is not None and A.shape[1] > 2**n_wires:
+        raise ValueError("Input state must be of length %d or smaller to be padded; got length %d."
+                         % (2**n_wires, A.shape[1]))
+    A = A/np.linalg.norm(A, axis=1, keepdims=True)
+    B = B/np.linalg.norm(B, axis=1, keepdims=True)
+    return (A @ B.T)**2
+
+def basis_kernel_matrix(A, B, n_wires=None):
+    """Kernel matrix of the basis encoding, 1 if the bit strings are
+       equal and 0 otherwise."""
+    A = np.asarray(A)
+    B = np.asarray(B)
+    if n_wires is not None and A.shape[1] != n_wires:
+        raise ValueError("State must be of length %d; got length %d." % (n_wires, A.shape[1]))
+    #Label every distinct row and compare the labels
+    [_, labels] = np.unique(np.concatenate((A, B)), axis=0, return_inverse=True)
+    labels = labels.reshape(-1)
+    return (labels[:len(A), None] == labels[None, len(A):]).astype(float)
@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from packed_kernel import PackedKernelMatrix
+from qiskit_pipeline import backend_name, transpiled_kernel_circuit, bind_kernel_circuits, max_batch_size, kernel_matrix_qiskit
+
+#Remote backends queue every job, so waiting for one job at a time leaves
+#the device idle between jobs. The kernel circuits are packed into jobs of
+#at most the batch limit of the backend, up to max_in_flight jobs are
+#submitted at once, and the counts are written into the kernel matrix as
+#the jobs finish. Failed jobs are resubmitted with exponential backoff.
+
+async def run_job(backend, circuits, shots, executor, retries=3, retry_delay=1.0):
+    """Submit the circuits as one job and wait for its counts without
+       blocking the event loop, resubmitting it up to retries times."""
+    loop = asyncio.get_running_loop()
+    for attempt in range(retries + 1):
+        try:
+            job = await loop.run_in_executor(executor, lambda: backend.run(circuits, shots=shots))
+            result = await loop.run_in_executor(executor, job.result)
+            return [result.get_counts(k) for k in range(len(circuits))]
+        except Exception as error:
+            if attempt == retries:
+                raise
+            print("Job failed (%s), retrying in %0.1f s" % (error, retry_delay*2**attempt))
+            await asyncio.sleep(retry_delay*2**attempt)
+
+async def zero_counts_async(A, B, rows, cols, map_type, feature_dimension, reps, entanglement, backend, shots=1024,
+                            batch_size=None, max_in_flight=4, retries=3, retry_delay=1.0):
+    """Count the all zero outcomes of the kernel circuits of the pairs
+       (A[rows[k]], B[cols[k]]), with up to max_in_flight jobs at once."""
+    circuit, x, y = transpiled_kernel_circuit(map_type, feature_dimension, reps, entanglement, backend)
+    batch_size = batch_size or max_batch_size(backend)
+    zeros = '0'*feature_dimension
+    counts = np.empty(len(rows), dtype=int)
+    in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def run_batch(start, executor):
+        async with in_flight:
+            pairs = [(A[i], B[j]) for i, j in zip(rows[start:start + batch_size], cols[start:start + batch_size])]
+            circuits = bind_kernel_circuits(circuit, x, y, pairs)
+            return start, await run_job(backend, circuits, shots, executor, retries, retry_delay)
+
+    #Two threads per job in flight, one submitting and one waiting
+    with ThreadPoolExecutor(2*max_in_flight) as executor:
+        tasks = [asyncio.ensure_future(run_batch(start, executor)) for start in range(0, len(rows), batch_size)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                start, results = await finished
+                counts[start:start + len(results)] = [result.get(zeros, 0) for result in results]
+        finally:
+            for task in tasks:
+                task.cancel()
+    return counts
+
+def kernel_matrix_async(A, B, map_type, feature_dimension, reps, entanglement, backend, shots=1024,
+                        batch_size=None, max_in_flight=4, retries=3, retry_delay=1.0):
+    """kernel_matrix_qiskit with several jobs in flight at once. If B is A
+       only the strict upper triangle is run and a PackedKernelMatrix is
+       returned."""
+    if 'statevector' in backend_name(backend):
+        return kernel_matrix_qiskit(A, B, map_type, feature_dimension, reps, entanglement, backend)
+    symmetric = B is A
+    if symmetric:
+        rows, cols = np.triu_indices(len(A), k=1)
+    else:
+        rows, cols = np.indices((len(A), len(B))).reshape(2, -1)
+    counts = asyncio.run(zero_counts_async(A, B, rows, cols, map_type, feature_dimension, reps, entanglement, backend,
+                                           shots, batch_size, max_in_flight, retries, retry_delay))
+    values = counts/shots
+    if symmetric:
+        return PackedKernelMatrix(len(A), values)
+    return values.reshape(len(A), len(B))
@@ -0,0 +1,32 @@
+import time
+import numpy as np
+from fake_backend import FakeBackend
+from async_jobs import kernel_matrix_async
+from phase_kernel import phase_kernel_matrix
+
+#Throughput of the asynchronous job submission on the local fake backend,
+#for different amounts of jobs in flight, job latencies and failure rates.
+
+def main():
+    n_data = 40
+    feature_dimension = 3
+    shots = 1024
+
+    np.random.seed(0)
+    sample_train = np.random.uniform(0, np.pi, (n_data, feature_dimension))
+    exact = np.asarray(phase_kernel_matrix(sample_train, sample_train, 2, 'linear', 'zz'))
+
+    for latency, failure_rate in [(0.5, 0.0), (0.5, 0.2)]:
+        for max_in_flight in [1, 2, 4, 8]:
+            backend = FakeBackend(feature_dimension, latency, failure_rate, max_circuits=50, n_processes=max_in_flight, seed=0)
+            start = time.time()
+            matrix = np.asarray(kernel_matrix_async(sample_train, sample_train, 'zz', feature_dimension, 2, 'linear', backend,
+                                                    shots, max_in_flight=max_in_flight, retry_delay=0.1))
+            elapsed = time.time() - start
+            backend.shutdown()
+            error = np.abs(matrix - exact).max()
+            print("latency %0.1f s, failure rate %0.1f, %d in flight: %d jobs in %0.2f s, max error %0.3f"
+                  % (latency, failure_rate, max_in_flight, backend.jobs_submitted, elapsed, error))
+
+if __name__ == '__main__':
+    main()
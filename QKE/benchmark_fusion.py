@@ -0,0 +1,40 @@
+import time
+import numpy as np
+import QKE_PennyLane
+from QKE_PennyLane import *
+
+#Gates, depth and simulation time per kernel entry of the kernel circuits,
+#before and after the gate fusion passes of circuit_optimization, simulated
+#one circuit at a time and with the JAX backend. One circuit at a time the
+#passes run on every execution, which is why optimize_circuits only applies
+#to the JAX backend.
+
+def time_jax(sample_train, kernel_function, optimize):
+    """Time the train kernel matrix with the JAX backend, after compiling."""
+    QKE_PennyLane.kernel_backend = 'jax'
+    QKE_PennyLane.optimize_circuits = optimize
+    kernel_matrix(sample_train, sample_train, kernel_function)
+    start = time.time()
+    matrix = np.asarray(kernel_matrix(sample_train, sample_train, kernel_function))
+    return matrix, time.time() - start
+
+def main():
+    n_data = 60
+    kernel_functions = [kernel_angle, kernel_angle_homemade, kernel_IQP, kernel_zz]
+
+    np.random.seed(0)
+    sample_train = np.random.uniform(-1, 1, (n_data, n_wires))
+
+    for kernel_function in kernel_functions:
+        report = optimization_report(kernel_function, optimize_circuit(kernel_function), sample_train[0], sample_train[1])
+        print("%s, %d qubits" % (kernel_function.__name__, n_wires))
+        for label in ['before', 'after']:
+            print("%s: %d gates, depth %d, %0.2f ms per entry" % (label, report[label]['gates'], report[label]['depth'], 1000*report[label]['time']))
+        [reference, time_plain] = time_jax(sample_train, kernel_function, False)
+        [matrix, time_optimized] = time_jax(sample_train, kernel_function, True)
+        error = np.abs(matrix - reference).max()
+        print("jax: %0.3f s, optimized %0.3f s, max error: %0.1e" % (time_plain, time_optimized, error))
+        print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import time
+import numpy as np
+import QKE_PennyLane
+from QKE_PennyLane import *
+
+#Benchmark of the JAX backend against the default autograd backend, where
+#the kernel circuit is simulated for every pair of samples.
+
+def time_kernel_matrix(sample_train, kernel_function, backend, precision='float64'):
+    """Time the train kernel matrix with the given backend."""
+    QKE_PennyLane.kernel_backend = backend
+    QKE_PennyLane.kernel_precision = precision
+    start = time.time()
+    matrix = np.asarray(kernel_matrix(sample_train, sample_train, kernel_function))
+    return matrix, time.time() - start
+
+def main():
+    n_data = 60
+    kernel_functions = [kernel_angle, kernel_IQP, kernel_zz]
+
+    np.random.seed(0)
+    sample_train = np.random.uniform(-1, 1, (n_data, n_wires))
+
+    for kernel_function in kernel_functions:
+        [reference, time_circuit] = time_kernel_matrix(sample_train, kernel_function, 'circuit')
+        print("%s, %d x %d kernel matrix" % (kernel_function.__name__, n_data, n_data))
+        print("autograd: %0.3f s" % (time_circuit))
+        for precision in ['float64', 'float32']:
+            #The first run includes the compilation, the second reuses it
+            [matrix, time_compile] = time_kernel_matrix(sample_train, kernel_function, 'jax', precision)
+            [matrix, time_run] = time_kernel_matrix(sample_train, kernel_function, 'jax', precision)
+            error = np.abs(matrix - reference).max()
+            print("jax %s: %0.3f s with compilation, %0.3f s compiled, max error: %0.1e" % (precision, time_compile, time_run, error))
+        print()
+
+if __name__ == '__main__':
+    main()
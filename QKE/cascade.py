@@ -0,0 +1,86 @@
+import time
+from itertools import combinations
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.svm import SVC
+from quantum_svc import SupportVectorQSVC
+
+#Most samples are classified with a large margin by a classical SVM, and
+#evaluating the quantum kernel for them changes nothing. The cascade scores
+#every sample with the classical SVM first and only sends the samples with
+#a classical margin below the threshold to the quantum kernel SVM, which
+#evaluates them against its support vectors only.
+#The margin is on the scale of the binary SVM decision function, where the
+#margin boundaries of the training are at 1, for any amount of classes.
+
+def classical_margins(svc, samples):
+    """Margin of the classical prediction, |f(x)| for two classes. For more
+       classes the smallest one-vs-one decision value between the predicted
+       class and every other class, signed towards the predicted class so
+       it is negative if the class loses a pairwise vote. svc has to use
+       decision_function_shape='ovo'."""
+    decision = svc.decision_function(samples)
+    if decision.ndim == 1:
+        return np.abs(decision)
+    predicted = np.searchsorted(svc.classes_, svc.predict(samples))
+    margins = np.full(len(samples), np.inf)
+    #A positive decision value of the pair (i, j) votes for class i
+    for k, (i, j) in enumerate(combinations(range(len(svc.classes_)), 2)):
+        margins = np.where(predicted == i, np.minimum(margins, decision[:, k]), margins)
+        margins = np.where(predicted == j, np.minimum(margins, -decision[:, k]), margins)
+    return margins
+
+class CascadeQSVC(BaseEstimator, ClassifierMixin):
+    """Classical SVC followed by a quantum kernel SVC for the uncertain
+       samples, where kernel(A, B) computes the quantum kernel matrix
+       between the sets A and B. If prepare is given, kernel(A, B) takes
+       the prepared sets prepare(A) and prepare(B), and the support
+       vectors are only prepared once."""
+
+    def __init__(self, kernel, classical=None, threshold=1.0, C=1.0, chunk_size=1000, prepare=None):
+        self.kernel = kernel
+        self.classical = classical
+        self.threshold = threshold
+        self.C = C
+        self.chunk_size = chunk_size
+        self.prepare = prepare
+
+    def fit(self, samples, labels, matrix_train=None):
+        """Fit both SVCs, reusing matrix_train if the training kernel
+           matrix has already been computed."""
+        classical = clone(SVC(kernel='rbf', C=10) if self.classical is None else self.classical)
+        if len(np.unique(labels)) > 2:
+            #Pairwise decision values, which are not mixed with the votes
+            if 'decision_function_shape' not in classical.get_params():
+                raise ValueError("More than two classes need a classical SVC with one-vs-one decision values")
+            classical.set_params(decision_function_shape='ovo')
+        self.classical_ = classical.fit(samples, labels)
+        self.quantum_ = SupportVectorQSVC(self.kernel, self.C, self.chunk_size, self.prepare).fit(samples, labels, matrix_train)
+        self.classes_ = self.classical_.classes_
+        return self
+
+    def predict(self, samples):
+        samples = np.asarray(samples)
+        predictions = self.classical_.predict(samples)
+        uncertain = classical_margins(self.classical_, samples) < self.threshold
+        self.routed_fraction_ = uncertain.mean() if len(samples) else 0.0
+        if uncertain.any():
+            predictions[uncertain] = self.quantum_.predict(samples[uncertain])
+        return predictions
+
+def cascade_report(cascade, samples, labels, thresholds):
+    """Fraction of samples routed to the quantum kernel, accuracy and
+       prediction time per sample of a fitted cascade for every threshold.
+       A threshold of np.inf routes every sample, 0 none."""
+    labels = np.asarray(labels)
+    rows = []
+    for threshold in thresholds:
+        cascade.threshold = threshold
+        start = time.time()
+        predictions = cascade.predict(samples)
+        elapsed = time.time() - start
+        rows.append({'threshold': threshold,
+                     'routed': cascade.routed_fraction_,
+                     'accuracy': np.mean(predictions == labels),
+                     'time_per_sample': elapsed/len(samples)})
+    return rows
@@ -0,0 +1,44 @@
+import time
+import numpy as np
+import pennylane as qml
+
+#The kernel circuits U(x)U^dagger(y) are built from repeated embeddings, so
+#they contain runs of single qubit rotations on the same wire and, where the
+#embedding meets its adjoint, gates directly followed by their inverse. The
+#passes cancel adjacent inverse gates like CNOT pairs, merge consecutive
+#rotations about the same axis and fuse the remaining runs of single qubit
+#gates into one Rot. Cancelling and merging can expose new pairs, so the
+#passes are repeated. A compiled QNode runs the passes on every execution,
+#which costs more than they save when simulating one circuit at a time, so
+#they are only used with the JAX backend, where they run once when the
+#circuit is traced.
+
+kernel_pipeline = [
+    qml.transforms.cancel_inverses,
+    qml.transforms.merge_rotations,
+    qml.transforms.single_qubit_fusion,
+]
+
+def optimize_circuit(qnode, num_passes=3):
+    """The QNode with the kernel_pipeline applied to its circuit."""
+    optimized = qml.compile(qnode, pipeline=kernel_pipeline, num_passes=num_passes)
+    optimized.__name__ = qnode.__name__
+    return optimized
+
+def circuit_resources(qnode, *args):
+    """Amount of gates and depth of the circuit of the QNode for the
+       arguments, after decomposing the templates."""
+    resources = qml.specs(qml.compile(qnode, pipeline=[], num_passes=1))(*args)['resources']
+    return resources.num_gates, resources.depth
+
+def optimization_report(qnode, optimized, x, y, repeats=20):
+    """Gates, depth and simulation time per kernel entry of the kernel
+       circuit for the samples x and y, before and after optimizing."""
+    report = {}
+    for label, circuit in (('before', qnode), ('after', optimized)):
+        gates, depth = circuit_resources(circuit, x, y)
+        start = time.time()
+        for i in range(repeats):
+            value = circuit(x, y)
+        report[label] = {'gates': gates, 'depth': depth, 'time': (time.time() - start)/repeats, 'value': float(np.asarray(value))}
+    return report
@@ -44,7 +44,7 @@ def load_data_forest_oscar(size = 500):
 	return Data(X, Y)
 
 
-def load_data_forest(n_data, n_attributes):
+def load_data_forest(n_data, n_attributes, n_classes=2):
     '''
     Loads the dataset forest with length n_data and returns four datasets
     [iris_sample_train, iris_sample_test, iris_label_train, iris_label_test]
@@ -54,22 +54,33 @@ def load_data_forest(n_data, n_attributes):
     X_raw = data.data
     Y_raw = data.target
     #The forest dataset has classes from (1-7), by setting 
-    #n_classes = 2, we only look at 1 and 2.
-    n_classes = 2
-
-    #Reduces the amount of classes
-    [X, Y] = reduceClassDimensions(X_raw, Y_raw, n_classes, n_data)
+    #n_classes = 2, we only look at 1 and 2. n_classes = 7 keeps all classes.
+
+    if n_classes == 2:
+        #Reduces the amount of classes
+        [X, Y] = reduceClassDimensions(X_raw, Y_raw, n_classes, n_data)
+        stratify = None
+    else:
+        #The first samples rarely contain every class, so n_data random
+        #samples are split as evenly as possible over the classes
+        rng = np.random.RandomState(22)
+        sizes = [n_data // n_classes + (c < n_data % n_classes) for c in range(n_classes)]
+        indices = np.concatenate([rng.choice(np.flatnonzero(Y_raw == c + 1), size=size, replace=False)
+                                  for c, size in enumerate(sizes)])
+        X = X_raw[indices]
+        Y = Y_raw[indices]
+        stratify = Y
 
     #Split the dataset into training- and testset 
-    #for the sample and label.
+    #for the sample and label, stratified for more classes so every class is in both
     forest_sample_train, forest_sample_test, forest_label_train, forest_label_test = train_test_split(
-        X, Y, test_size=0.3, random_state=22)
+        X, Y, test_size=0.3, random_state=22, stratify=stratify)
     #Reduces the amount of attrubutes/features.
     [forest_sample_train, forest_sample_test] = reduceAttributeDimensions(n_attributes, forest_sample_train, forest_sample_test)
 
     return forest_sample_train, forest_sample_test, forest_label_train, forest_label_test
 
-def load_data_iris(n_data):
+def load_data_iris(n_data, n_classes=2):
     '''
     Loads the dataset iris with length n_data and returns four datasets
     [iris_sample_train, iris_sample_test, iris_label_train, iris_label_test]
@@ -78,12 +89,12 @@ def load_data_iris(n_data):
     data = iris
     X_raw = data.data
     Y_raw = data.target
-    #The forest dataset has classes from (0-2), by setting 
-    #n_classes = 1, we only look at 0 and 1.
-    n_classes = 1
+    #The iris dataset has classes from (0-2), by setting 
+    #n_classes = 2, we only look at 0 and 1. The samples are sorted
+    #by class, so all three classes need n_data = 150.
 
     #Reduces the amount of classes
-    [X, Y] = reduceClassDimensions(X_raw, Y_raw, n_classes, n_data)
+    [X, Y] = reduceClassDimensions(X_raw, Y_raw, n_classes - 1, n_data)
     #Split the dataset into training- and testset 
     #for the sample and label.
     iris_sample_train, iris_sample_test, iris_label_train, iris_label_test = train_test_split(
@@ -0,0 +1,57 @@
+import numpy as np
+from packed_kernel import PackedKernelMatrix
+
+#Identical samples have identical rows in the kernel matrix. Datasets like
+#covtype after PCA, or binary inputs for kernel_basis, contain many repeated
+#rows, so the kernel is only computed between the unique samples and the
+#full matrix is read from it through the index of every sample. Rounding
+#the samples to a grid first also merges rows that are almost identical.
+
+def unique_samples(samples, resolution=None):
+    """Unique rows of the samples, rounded to multiples of resolution if it
+       is given, and the index of every sample in them."""
+    samples = np.asarray(samples)
+    if resolution is not None:
+        samples = np.round(samples/resolution)*resolution
+    unique, inverse = np.unique(samples, axis=0, return_inverse=True)
+    return unique, inverse.ravel()
+
+class DeduplicatedKernel:
+    """Computes kernel matrices between the unique (quantized) samples
+       only, and counts the kernel entries evaluated and returned."""
+
+    def __init__(self, resolution=None):
+        self.resolution = resolution
+        self.entries_evaluated = 0
+        self.entries_total = 0
+
+    @property
+    def compression(self):
+        """Returned kernel entries per evaluated entry."""
+        return self.entries_total/max(self.entries_evaluated, 1)
+
+    def __call__(self, A, B, kernel):
+        """Kernel matrix between the sets A and B, where kernel(A, B)
+           computes the kernel matrix between the unique samples. If B is A
+           a PackedKernelMatrix is returned."""
+        unique_A, inverse_A = unique_samples(A, self.resolution)
+        if B is A:
+            n = len(A)
+            matrix = kernel(unique_A, unique_A)
+            if not isinstance(matrix, PackedKernelMatrix):
+                matrix = np.asarray(matrix)
+            self.entries_evaluated += len(unique_A)*(len(unique_A) + 1)//2
+            self.entries_total += n*(n + 1)//2
+            rows, cols = np.triu_indices(n, k=1)
+            #Index arrays are read straight from the packed storage
+            upper = matrix[inverse_A[rows], inverse_A[cols]]
+            if isinstance(matrix, PackedKernelMatrix) and np.isscalar(matrix.diagonal):
+                diagonal = matrix.diagonal
+            else:
+                diagonal = matrix[inverse_A, inverse_A]
+            return PackedKernelMatrix(n, upper, diagonal)
+        unique_B, inverse_B = unique_samples(B, self.resolution)
+        matrix = np.asarray(kernel(unique_A, unique_B))
+        self.entries_evaluated += len(unique_A)*len(unique_B)
+        self.entries_total += len(A)*len(B)
+        return matrix[np.ix_(inverse_A, inverse_B)]
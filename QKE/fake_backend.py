@@ -0,0 +1,103 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from qiskit.providers import BackendV2, Options
+from qiskit.transpiler import Target
+from qiskit.quantum_info import Statevector
+
+#Local stand-in for a remote backend, for testing and tuning the job
+#submission offline. Jobs run in a pool of processes, wait for the given
+#latency like a queued job on a device, fail with the given probability and
+#sample the counts from the exact statevector of every circuit.
+
+def _measured_qubits(circuit):
+    """Qubits measured into the classical bits 0, 1, ..."""
+    measured = {}
+    for instruction in circuit.data:
+        if instruction.operation.name == 'measure':
+            qubit = circuit.find_bit(instruction.qubits[0]).index
+            clbit = circuit.find_bit(instruction.clbits[0]).index
+            measured[clbit] = qubit
+    return [measured[clbit] for clbit in sorted(measured)]
+
+def _simulate(circuits, shots, latency, failure_rate, seed):
+    """Counts of every circuit, run in a worker process."""
+    rng = np.random.default_rng(seed)
+    time.sleep(latency)
+    if rng.random() < failure_rate:
+        raise RuntimeError("Job failed on the fake backend")
+    counts = []
+    for circuit in circuits:
+        qubits = _measured_qubits(circuit)
+        probabilities = Statevector(circuit.remove_final_measurements(inplace=False)).probabilities(qubits)
+        samples = rng.multinomial(shots, probabilities/probabilities.sum())
+        counts.append({format(k, '0%db' % len(qubits)): int(count) for k, count in enumerate(samples) if count})
+    return counts
+
+class FakeResult:
+    def __init__(self, counts):
+        self.counts = counts
+
+    def get_counts(self, experiment=0):
+        return self.counts[experiment]
+
+class FakeJob:
+    """Job running in the process pool of a FakeBackend."""
+
+    def __init__(self, job_id, future):
+        self._job_id = job_id
+        self.future = future
+
+    def job_id(self):
+        return self._job_id
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return FakeResult(self.future.result(timeout))
+
+class FakeBackend(BackendV2):
+    """Simulated backend with n_qubits fully connected qubits, where every
+       job takes latency seconds and fails with probability failure_rate.
+       At most n_processes jobs run at the same time."""
+
+    def __init__(self, n_qubits=5, latency=1.0, failure_rate=0.0, max_circuits=100, n_processes=4, seed=None):
+        super().__init__(name='fake_backend')
+        self._target = Target.from_configuration(basis_gates=['rz', 'sx', 'x', 'cx', 'measure'], num_qubits=n_qubits)
+        self._max_circuits = max_circuits
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.n_processes = n_processes
+        self.seeds = np.random.SeedSequence(seed)
+        self.executor = None
+        self.jobs_submitted = 0
+
+    @property
+    def target(self):
+        return self._target
+
+    @property
+    def max_circuits(self):
+        return self._max_circuits
+
+    @classmethod
+    def _default_options(cls):
+        return Options(shots=1024)
+
+    def run(self, run_input, **options):
+        circuits = run_input if isinstance(run_input, list) else [run_input]
+        if len(circuits) > self._max_circuits:
+            raise ValueError("%d circuits exceed the limit of %d per job" % (len(circuits), self._max_circuits))
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.n_processes)
+        shots = options.get('shots', self.options.shots)
+        seed = self.seeds.spawn(1)[0]
+        future = self.executor.submit(_simulate, circuits, shots, self.latency, self.failure_rate, seed)
+        self.jobs_submitted += 1
+        return FakeJob('fake-%d' % self.jobs_submitted, future)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,132 @@
+import numpy as np
+from sklearn.svm import SVC
+from kernel_states import gram_from_states
+
+#When labelled samples arrive over time, the kernel matrix of the samples
+#seen so far only grows by the kernel between the new samples and the stored
+#ones. The store keeps the kernel matrix, and the embedded states for state
+#based kernels, in buffers that double in size when full, so appending k
+#samples to N stored ones evaluates only the k x N and k x k blocks.
+
+class IncrementalKernelStore:
+    """Kernel matrix of a growing set of labelled samples. With a
+       state_function(X) returning the embedded states of the samples,
+       the kernel is computed from the stored states, otherwise
+       kernel(A, B) computes the kernel matrix between the sets A and B.
+       With a window only the newest window samples are kept."""
+
+    def __init__(self, state_function=None, conjugate=True, kernel=None, window=None, C=1.0, capacity=64):
+        if state_function is None and kernel is None:
+            raise ValueError("Either a state_function or a kernel is needed")
+        self.state_function = state_function
+        self.conjugate = conjugate
+        self.kernel = kernel
+        self.window = window
+        self.C = C
+        self.capacity = capacity
+        self.n = 0
+        self.entries_evaluated = 0
+        self._matrix = None
+        self._samples = None
+        self._states = None
+        self._labels = None
+        self.svc = None
+
+    @property
+    def matrix(self):
+        return self._matrix[:self.n, :self.n]
+
+    @property
+    def samples(self):
+        return self._samples[:self.n]
+
+    @property
+    def labels(self):
+        return self._labels[:self.n]
+
+    def _grow(self, size):
+        """Double the buffers until size samples fit."""
+        capacity = self.capacity
+        while capacity < size:
+            capacity *= 2
+        if capacity == len(self._matrix):
+            return
+        matrix = np.empty((capacity, capacity))
+        samples = np.empty((capacity,) + self._samples.shape[1:], dtype=self._samples.dtype)
+        labels = np.empty(capacity, dtype=self._labels.dtype)
+        matrix[:self.n, :self.n] = self.matrix
+        samples[:self.n] = self.samples
+        labels[:self.n] = self.labels
+        if self._states is not None:
+            states = np.empty((capacity, self._states.shape[1]), dtype=self._states.dtype)
+            states[:self.n] = self._states[:self.n]
+            self._states = states
+        self._matrix, self._samples, self._labels = matrix, samples, labels
+
+    def append(self, samples, labels):
+        """Add the samples, evaluating only their kernel against the stored
+           samples and each other."""
+        samples = np.asarray(samples)
+        labels = np.asarray(labels)
+        k = len(samples)
+        if self._matrix is None:
+            self._matrix = np.empty((0, 0))
+            self._samples = np.empty((0,) + samples.shape[1:], dtype=samples.dtype)
+            self._labels = np.empty(0, dtype=labels.dtype)
+        if self.state_function is not None:
+            states = np.asarray(self.state_function(samples))
+            if self._states is None:
+                self._states = np.empty((0, states.shape[1]), dtype=states.dtype)
+            self._grow(self.n + k)
+            cross = gram_from_states(states, self._states[:self.n], self.conjugate)
+            block = gram_from_states(states, states, self.conjugate)
+            self._states[self.n:self.n + k] = states
+        else:
+            self._grow(self.n + k)
+            if self.n:
+                cross = np.asarray(self.kernel(samples, self.samples))
+            else:
+                cross = np.empty((k, 0))
+            block = np.asarray(self.kernel(samples, samples))
+
+        n = self.n
+        self._matrix[n:n + k, :n] = cross
+        self._matrix[:n, n:n + k] = cross.T
+        self._matrix[n:n + k, n:n + k] = block
+        self._samples[n:n + k] = samples
+        self._labels[n:n + k] = labels
+        self.n += k
+        self.entries_evaluated += k*n + k*k
+        if self.window is not None and self.n > self.window:
+            self.remove(np.arange(self.n - self.window))
+        return self
+
+    def remove(self, indices):
+        """Remove the samples at the indices, no kernel entries are
+           evaluated."""
+        keep = np.setdiff1d(np.arange(self.n), indices)
+        m = len(keep)
+        self._matrix[:m, :m] = self._matrix[np.ix_(keep, keep)]
+        self._samples[:m] = self._samples[keep]
+        self._labels[:m] = self._labels[keep]
+        if self._states is not None:
+            self._states[:m] = self._states[keep]
+        self.n = m
+        return self
+
+    def fit(self):
+        """Refit the precomputed SVC on the stored kernel matrix."""
+        self.svc = SVC(kernel='precomputed', C=self.C).fit(self.matrix, self.labels)
+        return self.svc
+
+    def kernel_matrix(self, samples):
+        """Kernel matrix of the samples against the stored samples."""
+        if self.state_function is not None:
+            return gram_from_states(np.asarray(self.state_function(samples)), self._states[:self.n], self.conjugate)
+        return np.asarray(self.kernel(samples, self.samples))
+
+    def predict(self, samples):
+        return self.svc.predict(self.kernel_matrix(samples))
+
+    def score(self, samples, labels):
+        return self.svc.score(self.kernel_matrix(samples), labels)
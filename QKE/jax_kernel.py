@@ -0,0 +1,64 @@
+import numpy as np
+import jax
+import jax.numpy as jnp
+import pennylane as qml
+from packed_kernel import PackedKernelMatrix
+from circuit_optimization import optimize_circuit
+
+#JAX backend for the kernel QNodes. The kernel circuit is jit compiled once
+#and vmapped over blocks of (x, y) pairs of a fixed size, so the compilation
+#is reused for every block of the kernel matrix. 'float32' runs the whole
+#simulation in single precision (complex64 statevectors). The precision is
+#only set while the kernel matrix is computed, with the jax.enable_x64
+#context, so other JAX code in the process keeps its own setting. With
+#optimize the gate fusion passes run once, when the circuit is traced.
+
+#Compiled kernels by (kernel name, wires, precision, optimize)
+_compiled = {}
+
+def jax_kernel(kernel_function, precision='float64', optimize=False):
+    """jit compiled function evaluating the kernel QNode on a batch of
+       pairs, kernel(X, Y)[k] = kernel_function(X[k], Y[k]). It has to
+       be called inside jax.enable_x64(precision == 'float64')."""
+    key = (kernel_function.__name__, tuple(kernel_function.device.wires), precision, optimize)
+    if key not in _compiled:
+        dev = qml.device("default.qubit", wires=kernel_function.device.wires)
+        qnode = qml.QNode(kernel_function.func, dev, interface='jax')
+        if optimize:
+            qnode = optimize_circuit(qnode)
+        _compiled[key] = jax.jit(jax.vmap(qnode))
+    return _compiled[key]
+
+def jax_kernel_matrix(A, B, kernel_function, block_size=1024, precision='float64', unit_diagonal=True, optimize=False):
+    """Compute the matrix whose entries are the kernel evaluated on pairwise
+       data from sets A and B with the JAX backend. If B is A only the strict
+       upper triangle (and the diagonal if it is not 1) is evaluated and a
+       PackedKernelMatrix is returned."""
+    #The precision only applies inside this context
+    with jax.enable_x64(precision == 'float64'):
+        batched = jax_kernel(kernel_function, precision, optimize)
+        dtype = jnp.float64 if precision == 'float64' else jnp.float32
+        symmetric = B is A
+        A = np.asarray(A)
+        B = A if symmetric else np.asarray(B)
+        if symmetric:
+            rows, cols = np.triu_indices(len(A), k=0 if not unit_diagonal else 1)
+        else:
+            rows, cols = np.indices((len(A), len(B))).reshape(2, -1)
+        values = np.empty(len(rows), dtype=dtype)
+        for start in range(0, len(rows), block_size):
+            block_rows = rows[start:start + block_size]
+            block_cols = cols[start:start + block_size]
+            #Pad the last block so every block has the compiled shape
+            padding = block_size - len(block_rows)
+            block_rows = np.pad(block_rows, (0, padding), mode='edge')
+            block_cols = np.pad(block_cols, (0, padding), mode='edge')
+            x = jnp.asarray(A[block_rows], dtype=dtype)
+            y = jnp.asarray(B[block_cols], dtype=dtype)
+            values[start:start + block_size - padding] = np.asarray(batched(x, y))[:block_size - padding]
+        if not symmetric:
+            return values.reshape(len(A), len(B))
+        if unit_diagonal:
+            return PackedKernelMatrix(len(A), values, 1.0)
+        on_diagonal = rows == cols
+        return PackedKernelMatrix(len(A), values[~on_diagonal], values[on_diagonal])
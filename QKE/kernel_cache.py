@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+#Kernel matrices are stored on disk as .npy files and addressed by the kernel
+#(its name and settings) and by a hash of every input row. A request for rows
+#and columns that overlap a cached matrix reuses the cached block and only
+#computes the new rows and columns. The least recently used matrices are
+#removed when the cache grows past max_bytes.
+
+def kernel_key(kernel_id, settings):
+    """Hash identifying a kernel and its settings, for example
+       kernel_key('kernel_angle', {'layers': 2, 'n_qubits': 4})."""
+    description = json.dumps([kernel_id, settings], sort_keys=True, default=str)
+    return hashlib.sha1(description.encode()).hexdigest()
+
+def row_hashes(samples):
+    """Hash of every row of the samples."""
+    return [hashlib.sha1(np.ascontiguousarray(row, dtype=float).tobytes()).hexdigest() for row in np.asarray(samples)]
+
+def prepared_once(kernel, prepare):
+    """kernel(A, B) on the samples, where kernel takes prepared sets and
+       every distinct sample is only prepared once over all calls."""
+    prepared = {}
+
+    def prepared_set(samples):
+        samples = np.asarray(samples)
+        hashes = row_hashes(samples)
+        new = [i for i, h in enumerate(hashes) if h not in prepared]
+        if new:
+            for i, value in zip(new, prepare(samples[new])):
+                prepared[hashes[i]] = value
+        return np.array([prepared[h] for h in hashes])
+
+    def prepared_kernel(A, B):
+        prepared_A = prepared_set(A)
+        return kernel(prepared_A, prepared_A if B is A else prepared_set(B))
+
+    return prepared_kernel
+
+class KernelCache:
+
+    def __init__(self, directory='kernel_cache', max_bytes=2**30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, 'index.json')
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {}
+
+    def size(self):
+        """Total size in bytes of the cached matrices."""
+        return sum(entry['bytes'] for entry in self.index.values())
+
+    def kernel_matrix(self, A, B, kernel, kernel_id, settings, dtype=np.float64):
+        """Return the kernel matrix between the sets A and B, where
+           kernel(A, B) computes it. If B is A the matrix is symmetric
+           and the missing blocks are only computed once. The matrix is
+           stored with the given dtype."""
+        symmetric = B is A
+        key = kernel_key(kernel_id, settings)
+        rows = row_hashes(A)
+        cols = rows if symmetric else row_hashes(B)
+        matrix = np.empty((len(rows), len(cols)), dtype=dtype)
+
+        #Copy the block shared with the best matching cached matrix
+        name = self._best_entry(key, rows, cols)
+        known_rows = np.zeros(len(rows), dtype=bool)
+        known_cols = np.zeros(len(cols), dtype=bool)
+        if name is not None:
+            row_position, col_position = self._load_hashes(name)
+            cached = np.load(self._path(name, '.npy'), mmap_mode='r')
+            shared_rows = [i for i, h in enumerate(rows) if h in row_position]
+            shared_cols = [j for j, h in enumerate(cols) if h in col_position]
+            cached_rows = [row_position[rows[i]] for i in shared_rows]
+            cached_cols = [col_position[cols[j]] for j in shared_cols]
+            if shared_rows and shared_cols:
+                matrix[np.ix_(shared_rows, shared_cols)] = cached[np.ix_(cached_rows, cached_cols)]
+                known_rows[shared_rows] = True
+                known_cols[shared_cols] = True
+            del cached
+            self.index[name]['last_used'] = time.time()
+
+        #Compute the rows and columns missing from the cache
+        A = np.asarray(A)
+        B = A if symmetric else np.asarray(B)
+        if symmetric:
+            known_rows = known_rows & known_cols
+        missing_rows = np.flatnonzero(~known_rows)
+        missing_cols = np.flatnonzero(~known_cols)
+        present_rows = np.flatnonzero(known_rows)
+        if symmetric:
+            if len(missing_rows):
+                A_missing = A[missing_rows]
+                matrix[np.ix_(missing_rows, missing_rows)] = np.asarray(kernel(A_missing, A_missing))
+                if len(present_rows):
+                    block = np.asarray(kernel(A_missing, A[present_rows]))
+                    matrix[np.ix_(missing_rows, present_rows)] = block
+                    matrix[np.ix_(present_rows, missing_rows)] = block.T
+        else:
+            if len(missing_rows):
+                matrix[missing_rows, :] = np.asarray(kernel(A[missing_rows], B))
+            if len(present_rows) and len(missing_cols):
+                matrix[np.ix_(present_rows, missing_cols)] = np.asarray(kernel(A[present_rows], B[missing_cols]))
+
+        if len(missing_rows) or len(missing_cols):
+            self._store(key, rows, cols, matrix, superseded=name)
+        else:
+            self._save_index()
+        return matrix
+
+    def kernel_matrices(self, sample_train, sample_test, kernel, kernel_id, settings, dtype=np.float64, prepare=None):
+        """Return the train and test kernel matrices through kernel_matrix,
+           so both reuse the cached blocks of earlier runs. If prepare is
+           given, kernel(A, B) takes the prepared sets prepare(A) and
+           prepare(B), and every sample missing from the cache is prepared
+           once for both matrices."""
+        if prepare is not None:
+            kernel = prepared_once(kernel, prepare)
+        matrix_train = self.kernel_matrix(sample_train, sample_train, kernel, kernel_id, settings, dtype)
+        matrix_test = self.kernel_matrix(sample_test, sample_train, kernel, kernel_id, settings, dtype)
+        return matrix_train, matrix_test
+
+    def clear(self):
+        """Remove every cached matrix."""
+        for name in list(self.index):
+            self._remove(name)
+        self._save_index()
+
+    def _path(self, name, extension):
+        return os.path.join(self.directory, name + extension)
+
+    def _best_entry(self, key, rows, cols):
+        """Cached matrix of the same kernel sharing the largest block."""
+        best = None
+        best_overlap = 0
+        for name, entry in self.index.items():
+            if entry['key'] != key:
+                continue
+            row_position, col_position = self._load_hashes(name)
+            overlap = sum(h in row_position for h in rows)*sum(h in col_position for h in cols)
+            if overlap > best_overlap:
+                best = name
+                best_overlap = overlap
+        return best
+
+    def _load_hashes(self, name):
+        """Map from row hash to row (and column) index of a cached matrix."""
+        with open(self._path(name, '.json')) as f:
+            hashes = json.load(f)
+        row_position = {h: i for i, h in reversed(list(enumerate(hashes['rows'])))}
+        col_position = {h: j for j, h in reversed(list(enumerate(hashes['cols'])))}
+        return row_position, col_position
+
+    def _store(self, key, rows, cols, matrix, superseded=None):
+        name = hashlib.sha1((key + ''.join(rows) + '|' + ''.join(cols)).encode()).hexdigest()
+        np.save(self._path(name, '.npy'), matrix)
+        with open(self._path(name, '.json'), 'w') as f:
+            json.dump({'rows': rows, 'cols': cols}, f)
+        #A cached matrix fully contained in the new one is no longer needed
+        if superseded is not None and superseded != name:
+            row_position, col_position = self._load_hashes(superseded)
+            if set(row_position) <= set(rows) and set(col_position) <= set(cols):
+                self._remove(superseded)
+        self.index[name] = {'key': key, 'bytes': matrix.nbytes, 'last_used': time.time()}
+        self._evict(keep=name)
+        self._save_index()
+
+    def _evict(self, keep):
+        """Remove the least recently used matrices until the cache fits."""
+        by_age = sorted(self.index, key=lambda name: self.index[name]['last_used'])
+        for name in by_age:
+            if self.size() <= self.max_bytes:
+                break
+            if name != keep:
+                self._remove(name)
+
+    def _remove(self, name):
+        for extension in ['.npy', '.json']:
+            if os.path.exists(self._path(name, extension)):
+                os.remove(self._path(name, extension))
+        del self.index[name]
+
+    def _save_index(self):
+        with open(self.index_path, 'w') as f:
+            json.dump(self.index, f)
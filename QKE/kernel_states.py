@@ -0,0 +1,54 @@
+import numpy as np
+from packed_kernel import PackedKernelMatrix, packed_gram_from_states
+
+#Fidelity kernels only depend on the embedded states |psi(x)> = U(x)|0>.
+#Instead of running U(x)U^dagger(y) for every pair, each sample is simulated
+#once and the whole kernel matrix is built from the stacked statevectors.
+
+#Data types of the statevectors and kernel matrices for each precision.
+#'float32' halves the memory and bandwidth of the states and kernel matrices.
+precision_dtypes = {
+    'float64': (np.complex128, np.float64),
+    'float32': (np.complex64, np.float32),
+}
+
+def embedding_states(samples, state_function, precision='float64'):
+    """Simulate the embedding circuit once per sample and stack the
+       statevectors into an array of shape (n_samples, 2**n_qubits)."""
+    return np.array([np.asarray(state_function(x)) for x in samples], dtype=precision_dtypes[precision][0])
+
+def gram_from_states(states_A, states_B, conjugate=True):
+    """Compute the kernel matrix |<psi(b)|psi(a)>|^2 between two sets of
+       statevectors with one matrix product, in the precision of the
+       states. Kernels where the second
+       half of the circuit is the transpose instead of the adjoint of the
+       embedding use conjugate=False, giving |psi(b)^T psi(a)|^2."""
+    states_B = np.conj(states_B) if conjugate else states_B
+    return np.abs(states_A @ states_B.T)**2
+
+def gram_train_test(sample_train, sample_test, prepare_states, conjugate=True):
+    """Compute the train and test kernel matrices in one pass over the
+       union of the samples, so every sample is only simulated once.
+       prepare_states maps a set of samples to their stacked statevectors.
+       The train kernel matrix is a PackedKernelMatrix."""
+    n_train = len(sample_train)
+    states = prepare_states(np.concatenate((sample_train, sample_test)))
+    states_train = states[:n_train]
+    states_test = states[n_train:]
+    matrix_train = packed_gram_from_states(states_train, conjugate)
+    matrix_test = gram_from_states(states_test, states_train, conjugate)
+    return matrix_train, matrix_test
+
+def emulate_shots(matrix, shots=1024, seed=None):
+    """Emulate measuring every kernel entry with a finite amount of shots.
+       The entry is the probability of measuring all zeros, so the measured
+       value is a binomial sample divided by shots. A unit diagonal is kept,
+       U(x)U^dagger(x) always returns all zeros on a simulator."""
+    rng = np.random.default_rng(seed)
+    if isinstance(matrix, PackedKernelMatrix):
+        upper = rng.binomial(shots, np.clip(matrix.upper, 0, 1))/shots
+        diagonal = matrix.diagonal
+        if not np.isscalar(diagonal):
+            diagonal = rng.binomial(shots, np.clip(diagonal, 0, 1))/shots
+        return PackedKernelMatrix(matrix.n, upper, diagonal)
+    return rng.binomial(shots, np.clip(np.asarray(matrix), 0, 1))/shots
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+#SMO type SVM solvers only look at two rows of the kernel matrix per
+#iteration. LazyKernelMatrix computes the rows of the quantum kernel matrix
+#when they are first requested and keeps the most recently used ones in a
+#bounded cache, and LazyQSVC is a binary SMO solver working on those rows,
+#so the full N x N kernel matrix is never stored. For kernels with a per
+#sample part, like the statevectors of state based kernels, it is passed as
+#prepare and computed once for all samples, so a row is one product with
+#the prepared samples instead of simulating all samples again.
+
+class LazyKernelMatrix:
+    """Kernel matrix of the samples with themselves, where kernel(A, B)
+       computes the kernel matrix between the sets A and B. At most
+       cache_rows rows are kept in memory. If prepare is given, kernel(A, B)
+       takes the prepared sets prepare(A) and prepare(B)."""
+
+    def __init__(self, kernel, samples, cache_rows=256, unit_diagonal=True, prepare=None):
+        self.kernel = kernel
+        self.samples = np.asarray(samples)
+        self.prepared = self.samples if prepare is None else prepare(self.samples)
+        self.cache_rows = cache_rows
+        self.rows = OrderedDict()
+        self.rows_evaluated = 0
+        if unit_diagonal:
+            self.diagonal = np.ones(len(self.samples))
+        else:
+            self.diagonal = np.array([np.asarray(kernel(self.prepared[i:i+1], self.prepared[i:i+1]))[0, 0]
+                                      for i in range(len(self.samples))])
+
+    def __len__(self):
+        return len(self.samples)
+
+    def row(self, i):
+        """Row i of the kernel matrix."""
+        if i in self.rows:
+            self.rows.move_to_end(i)
+            return self.rows[i]
+        row = np.asarray(self.kernel(self.prepared[i:i+1], self.prepared))[0]
+        self.rows_evaluated += 1
+        self.rows[i] = row
+        if len(self.rows) > self.cache_rows:
+            self.rows.popitem(last=False)
+        return row
+
+class LazyQSVC(BaseEstimator, ClassifierMixin):
+    """Binary C-SVC solved with SMO and second order working set selection
+       (Fan, Chen and Lin, JMLR 6, 2005) on a LazyKernelMatrix."""
+
+    def __init__(self, kernel, C=1.0, tol=1e-3, cache_rows=256, max_iter=100000, unit_diagonal=True, chunk_size=1000,
+                 prepare=None):
+        self.kernel = kernel
+        self.C = C
+        self.tol = tol
+        self.cache_rows = cache_rows
+        self.max_iter = max_iter
+        self.unit_diagonal = unit_diagonal
+        self.chunk_size = chunk_size
+        self.prepare = prepare
+
+    def fit(self, samples, labels):
+        samples = np.asarray(samples)
+        self.classes_, y = np.unique(labels, return_inverse=True)
+        if len(self.classes_) != 2:
+            raise ValueError("LazyQSVC only supports two classes, got %d" % len(self.classes_))
+        y = 2.0*y - 1
+        matrix = LazyKernelMatrix(self.kernel, samples, self.cache_rows, self.unit_diagonal, self.prepare)
+        n = len(samples)
+        C = self.C
+        alpha = np.zeros(n)
+        #Gradient of the dual objective 1/2 a^T Q a - e^T a
+        gradient = -np.ones(n)
+
+        for iteration in range(self.max_iter):
+            #Indices that can move up or down along y
+            up = ((y > 0) & (alpha < C)) | ((y < 0) & (alpha > 0))
+            low = ((y > 0) & (alpha > 0)) | ((y < 0) & (alpha < C))
+            violation = -y*gradient
+            i = np.flatnonzero(up)[np.argmax(violation[up])]
+            g_max = violation[i]
+            g_min = violation[low].min()
+            if g_max - g_min < self.tol:
+                break
+            row_i = matrix.row(i)
+            #Second order choice of j, the largest decrease of the objective
+            candidates = low & (violation < g_max)
+            b = g_max - violation[candidates]
+            a = matrix.diagonal[i] + matrix.diagonal[candidates] - 2*row_i[candidates]
+            a = np.where(a > 0, a, 1e-12)
+            j = np.flatnonzero(candidates)[np.argmax(b**2/a)]
+            row_j = matrix.row(j)
+
+            #Move alpha_i by y_i*step and alpha_j by -y_j*step within [0, C]
+            quad = max(matrix.diagonal[i] + matrix.diagonal[j] - 2*row_i[j], 1e-12)
+            step = (g_max - violation[j])/quad
+            step = min(step, C - alpha[i] if y[i] > 0 else alpha[i])
+            step = min(step, alpha[j] if y[j] > 0 else C - alpha[j])
+            alpha[i] += y[i]*step
+            alpha[j] -= y[j]*step
+            gradient += step*y*(row_i - row_j)
+
+        self.n_iter_ = iteration + 1
+        self.rows_evaluated_ = matrix.rows_evaluated
+        #Bias from the free support vectors, or the middle of the bounds
+        violation = -y*gradient
+        free = (alpha > 0) & (alpha < C)
+        if free.any():
+            self.intercept_ = violation[free].mean()
+        else:
+            up = ((y > 0) & (alpha < C)) | ((y < 0) & (alpha > 0))
+            low = ((y > 0) & (alpha > 0)) | ((y < 0) & (alpha < C))
+            self.intercept_ = (violation[up].max() + violation[low].min())/2
+        self.support_ = np.flatnonzero(alpha > 0)
+        self.support_vectors_ = samples[self.support_]
+        self.prepared_support_vectors_ = matrix.prepared[self.support_]
+        self.dual_coef_ = (alpha*y)[self.support_]
+        return self
+
+    def decision_function(self, samples):
+        """Evaluated against the support vectors only, chunk by chunk."""
+        samples = np.asarray(samples)
+        decisions = np.empty(len(samples))
+        for start in range(0, len(samples), self.chunk_size):
+            chunk = samples[start:start + self.chunk_size]
+            if self.prepare is not None:
+                chunk = self.prepare(chunk)
+            chunk = np.asarray(self.kernel(chunk, self.prepared_support_vectors_))
+            decisions[start:start + len(chunk)] = chunk @ self.dual_coef_ + self.intercept_
+        return decisions
+
+    def predict(self, samples):
+        return self.classes_[(self.decision_function(samples) > 0).astype(int)]
@@ -0,0 +1,81 @@
+import numpy as np
+from scipy.optimize import nnls
+
+#Comparing kernels on the same data evaluates the same pairs of samples once
+#per kernel. Here every kernel is given as prepare(X), the per sample part
+#of the kernel like the embedded states, and block(F_A, F_B), the kernel
+#matrix between two prepared sets. The samples are prepared once per kernel
+#and every tile of sample pairs is evaluated for all kernels in one pass.
+#The kernel matrices are then combined with weights learned from their
+#alignment with the labels, without evaluating any kernel again.
+
+def tiled_kernel_matrices(prepared_A, prepared_B, kernels, symmetric=False, tile_size=256):
+    """Evaluate the kernel matrices of all kernels between the prepared
+       sets tile by tile. If symmetric only the tiles of the upper
+       triangle are evaluated."""
+    n_A = len(next(iter(prepared_A.values())))
+    n_B = len(next(iter(prepared_B.values())))
+    matrices = {name: np.empty((n_A, n_B)) for name in kernels}
+    for i in range(0, n_A, tile_size):
+        for j in range(i if symmetric else 0, n_B, tile_size):
+            rows = slice(i, i + tile_size)
+            cols = slice(j, j + tile_size)
+            for name, (prepare, block) in kernels.items():
+                tile = np.asarray(block(prepared_A[name][rows], prepared_B[name][cols]))
+                matrices[name][rows, cols] = tile
+                if symmetric and i != j:
+                    matrices[name][cols, rows] = tile.T
+    return matrices
+
+def multi_kernel_matrices(A, B, kernels, tile_size=256):
+    """Kernel matrices between the sets A and B for every kernel in the
+       dict kernels of name: (prepare, block). If B is A only the tiles
+       of the upper triangle are evaluated."""
+    symmetric = B is A
+    prepared_A = {name: prepare(np.asarray(A)) for name, (prepare, block) in kernels.items()}
+    prepared_B = prepared_A if symmetric else {name: prepare(np.asarray(B)) for name, (prepare, block) in kernels.items()}
+    return tiled_kernel_matrices(prepared_A, prepared_B, kernels, symmetric, tile_size)
+
+def multi_kernel_train_test(sample_train, sample_test, kernels, tile_size=256):
+    """Train and test kernel matrices of every kernel, where the union of
+       the samples is prepared once per kernel."""
+    n_train = len(sample_train)
+    samples = np.concatenate((sample_train, sample_test))
+    prepared = {name: prepare(samples) for name, (prepare, block) in kernels.items()}
+    prepared_train = {name: values[:n_train] for name, values in prepared.items()}
+    prepared_test = {name: values[n_train:] for name, values in prepared.items()}
+    matrices_train = tiled_kernel_matrices(prepared_train, prepared_train, kernels, True, tile_size)
+    matrices_test = tiled_kernel_matrices(prepared_test, prepared_train, kernels, False, tile_size)
+    return matrices_train, matrices_test
+
+def centered(matrix):
+    """Kernel matrix of the features with their mean removed, H K H."""
+    matrix = np.asarray(matrix)
+    return matrix - matrix.mean(axis=0) - matrix.mean(axis=1)[:, None] + matrix.mean()
+
+def alignment(matrix, labels):
+    """Centered kernel target alignment of the kernel matrix with the
+       labels, where the ideal kernel is 1 for samples of the same class
+       and -1 otherwise."""
+    labels = np.asarray(labels)
+    target = np.where(labels[:, None] == labels[None, :], 1.0, -1.0)
+    matrix = centered(matrix)
+    target = centered(target)
+    return np.sum(matrix*target)/(np.linalg.norm(matrix)*np.linalg.norm(target))
+
+def alignment_weights(matrices, labels):
+    """Nonnegative weights of the kernel matrices, such that the weighted
+       sum of the centered matrices is closest to the centered ideal kernel
+       of the labels (Cortes, Mohri and Rostamizadeh, JMLR 13, 2012),
+       scaled to sum to 1."""
+    labels = np.asarray(labels)
+    target = centered(np.where(labels[:, None] == labels[None, :], 1.0, -1.0)).ravel()
+    columns = np.column_stack([centered(matrix).ravel() for matrix in matrices])
+    weights, residual = nnls(columns, target)
+    if weights.sum() == 0:
+        return np.full(len(matrices), 1/len(matrices))
+    return weights/weights.sum()
+
+def combine_kernels(matrices, weights):
+    """Weighted sum of the kernel matrices."""
+    return sum(weight*np.asarray(matrix) for weight, matrix in zip(weights, matrices))
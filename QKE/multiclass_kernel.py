@@ -0,0 +1,42 @@
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.svm import SVC
+
+#SVC(kernel='precomputed') already handles more than two classes one-vs-one,
+#every binary SVM is trained on the rows and columns of the samples of its
+#two classes. One-vs-rest is not available in SVC, here every class gets one
+#binary SVM on the whole kernel matrix of the training set. The quantum
+#kernel matrix is computed once, and adding classes adds no kernel
+#evaluations, only binary SVMs.
+
+class OneVsRestQSVC(BaseEstimator, ClassifierMixin):
+    """One-vs-rest multi-class SVC on a precomputed kernel matrix, one SVC
+       per class on the whole matrix."""
+
+    def __init__(self, C=1.0):
+        self.C = C
+
+    def __sklearn_tags__(self):
+        #The samples are rows of a kernel matrix, cross validation slices
+        #the columns as well
+        tags = super().__sklearn_tags__()
+        tags.input_tags.pairwise = True
+        return tags
+
+    def _more_tags(self):
+        return {'pairwise': True}
+
+    def fit(self, matrix_train, labels):
+        labels = np.asarray(labels)
+        matrix_train = np.asarray(matrix_train)
+        self.classes_ = np.unique(labels)
+        self.estimators_ = [SVC(kernel='precomputed', C=self.C).fit(matrix_train, labels == c) for c in self.classes_]
+        return self
+
+    def decision_function(self, matrix_test):
+        """Decision function of every class, shape (n_samples, n_classes)."""
+        matrix_test = np.asarray(matrix_test)
+        return np.column_stack([svc.decision_function(matrix_test) for svc in self.estimators_])
+
+    def predict(self, matrix_test):
+        return self.classes_[np.argmax(self.decision_function(matrix_test), axis=1)]
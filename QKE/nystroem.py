@@ -0,0 +1,76 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.pipeline import make_pipeline
+from sklearn.svm import LinearSVC
+
+#Nystroem approximation of a quantum kernel. Only the kernel between the
+#samples and m landmark samples is evaluated, and the samples are mapped to
+#m features whose inner products approximate the kernel. A linear SVM on
+#these features replaces the precomputed SVC, so the kernel cost and the
+#memory grow linearly with the amount of samples.
+
+def select_landmarks(samples, n_landmarks, method='uniform', kernel=None, seed=None):
+    """Choose the landmark samples of the Nystroem approximation.
+       'uniform' draws samples at random, 'kmeans' uses k-means cluster
+       centers and 'leverage' samples from a uniform candidate pool
+       according to the ridge leverage scores of the kernel."""
+    samples = np.asarray(samples)
+    rng = np.random.default_rng(seed)
+    n_landmarks = min(n_landmarks, len(samples))
+    if method == 'uniform':
+        return samples[rng.choice(len(samples), size=n_landmarks, replace=False)]
+    if method == 'kmeans':
+        kmeans = MiniBatchKMeans(n_clusters=n_landmarks, random_state=seed, n_init=3)
+        return kmeans.fit(samples).cluster_centers_
+    if method == 'leverage':
+        #The candidate pool only depends on n_landmarks, not on the amount of samples
+        pool = samples[rng.choice(len(samples), size=min(4*n_landmarks, len(samples)), replace=False)]
+        scores = leverage_scores(np.asarray(kernel(pool, pool)))
+        return pool[rng.choice(len(pool), size=n_landmarks, replace=False, p=scores/scores.sum())]
+    raise ValueError("Unknown landmark method: %s" % method)
+
+def leverage_scores(matrix, regularization=1e-3):
+    """Ridge leverage scores diag(K (K + lambda n I)^-1) of a kernel matrix."""
+    n = len(matrix)
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    eigenvalues = np.clip(eigenvalues, 0, None)
+    weights = eigenvalues/(eigenvalues + regularization*n)
+    return np.clip(np.sum(eigenvectors**2*weights, axis=1), 1e-12, None)
+
+class QuantumNystroem(BaseEstimator, TransformerMixin):
+    """Map samples to the Nystroem features of the kernel, where
+       kernel(A, B) computes the kernel matrix between the sets A and B."""
+
+    def __init__(self, kernel, n_landmarks=100, method='uniform', chunk_size=1000, seed=None):
+        self.kernel = kernel
+        self.n_landmarks = n_landmarks
+        self.method = method
+        self.chunk_size = chunk_size
+        self.seed = seed
+
+    def fit(self, samples, labels=None):
+        self.landmarks_ = select_landmarks(samples, self.n_landmarks, self.method, self.kernel, self.seed)
+        landmark_matrix = np.asarray(self.kernel(self.landmarks_, self.landmarks_))
+        #W^(-1/2) of the landmark kernel matrix, ignoring the null space
+        eigenvalues, eigenvectors = np.linalg.eigh(landmark_matrix)
+        eigenvalues = np.clip(eigenvalues, 1e-12, None)
+        self.normalization_ = eigenvectors/np.sqrt(eigenvalues) @ eigenvectors.T
+        return self
+
+    def transform(self, samples):
+        """Evaluate the kernel against the landmarks chunk by chunk."""
+        samples = np.asarray(samples)
+        features = np.empty((len(samples), len(self.landmarks_)))
+        for start in range(0, len(samples), self.chunk_size):
+            chunk = samples[start:start + self.chunk_size]
+            features[start:start + len(chunk)] = np.asarray(self.kernel(chunk, self.landmarks_)) @ self.normalization_
+        return features
+
+def nystroem_svm(kernel, n_landmarks=100, method='uniform', C=1.0, seed=None):
+    """Linear SVM on the Nystroem features of the kernel, usable like
+       any classifier with fit, score and cross_val_score."""
+    return make_pipeline(
+        QuantumNystroem(kernel, n_landmarks, method, seed=seed),
+        LinearSVC(C=C),
+    )
@@ -0,0 +1,99 @@
+import numpy as np
+
+#A kernel matrix of a set with itself is symmetric, so only the strict upper
+#triangle has to be evaluated and stored. The dense matrix needed by
+#SVC(kernel='precomputed') is only built when numpy asks for it.
+
+class PackedKernelMatrix:
+    """Symmetric n x n kernel matrix stored as its packed strict upper
+       triangle (row by row) and its diagonal. The diagonal is a scalar
+       for fidelity kernels, where every entry on it is 1."""
+
+    def __init__(self, n, upper, diagonal=1.0):
+        self.n = n
+        self.upper = np.asarray(upper)
+        self.diagonal = diagonal
+        if len(self.upper) != n*(n-1)//2:
+            raise ValueError("Expected %d packed entries for n = %d, got %d" % (n*(n-1)//2, n, len(self.upper)))
+
+    @property
+    def shape(self):
+        return (self.n, self.n)
+
+    @property
+    def dtype(self):
+        return self.upper.dtype
+
+    @property
+    def ndim(self):
+        return 2
+
+    def __len__(self):
+        return self.n
+
+    def packed_index(self, i, j):
+        """Position of the entry (i, j), i < j, in the packed upper triangle."""
+        return i*self.n - i*(i+1)//2 + (j - i - 1)
+
+    def row_slice(self, i):
+        """Slice of the packed array holding row i right of the diagonal."""
+        start = self.packed_index(i, i+1)
+        return slice(start, start + self.n - i - 1)
+
+    def to_dense(self, dtype=None):
+        """Expand the packed triangle into the full symmetric matrix."""
+        dense = np.empty(self.shape, dtype=dtype or self.dtype)
+        #Row by row, so no index arrays of the size of the triangle are needed
+        for i in range(self.n - 1):
+            row = self.upper[self.row_slice(i)]
+            dense[i, i+1:] = row
+            dense[i+1:, i] = row
+        dense[np.diag_indices(self.n)] = self.diagonal
+        return dense
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_dense(dtype)
+
+    def __getitem__(self, key):
+        #Index arrays, for example from np.ix_ in cross validation, are read
+        #straight from the packed storage without expanding the matrix
+        if isinstance(key, tuple) and len(key) == 2 and all(isinstance(k, np.ndarray) for k in key):
+            i, j = np.broadcast_arrays(*key)
+            low = np.minimum(i, j)
+            high = np.maximum(i, j)
+            on_diagonal = low == high
+            values = np.broadcast_to(self.diagonal, (self.n,))[low].astype(self.dtype)
+            #Only the entries off the diagonal are read from the packed
+            #triangle, which is empty for n = 1
+            off = ~on_diagonal
+            values[off] = self.upper[self.packed_index(low[off], high[off])]
+            return values
+        return self.to_dense()[key]
+
+def packed_kernel_matrix(A, kernel_function, unit_diagonal=True):
+    """Compute the kernel matrix of the set A with itself, evaluating
+       only the strict upper triangle, and the diagonal if it is not
+       known to be 1."""
+    n = len(A)
+    upper = np.array([kernel_function(A[i], A[j]) for i in range(n) for j in range(i+1, n)], dtype=float)
+    if unit_diagonal:
+        diagonal = 1.0
+    else:
+        diagonal = np.array([kernel_function(a, a) for a in A], dtype=float)
+    return PackedKernelMatrix(n, upper, diagonal)
+
+def packed_gram_from_states(states, conjugate=True):
+    """Packed kernel matrix |<psi(j)|psi(i)>|^2 of a set of statevectors
+       with itself, built one row of the upper triangle at a time."""
+    n = len(states)
+    #Single precision states give a single precision matrix
+    upper = np.empty(n*(n-1)//2, dtype=np.finfo(states.dtype).dtype)
+    packed = PackedKernelMatrix(n, upper)
+    other = np.conj(states) if conjugate else states
+    for i in range(n - 1):
+        upper[packed.row_slice(i)] = np.abs(other[i+1:] @ states[i])**2
+    if conjugate:
+        packed.diagonal = 1.0
+    else:
+        packed.diagonal = np.abs(np.sum(states*states, axis=1))**2
+    return packed
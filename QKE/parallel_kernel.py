@@ -0,0 +1,88 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import pennylane as qml
+from packed_kernel import PackedKernelMatrix
+
+#The kernel matrix is split into square tiles that are evaluated in a process
+#pool. Every worker builds its own default.qubit device and QNode once, and
+#writes its entries straight into an output array in shared memory, so only
+#the tile coordinates are sent between the processes.
+
+#State of the current worker process, set up by _init_worker
+_worker = {}
+
+def _init_worker(circuit, n_wires, A, B, out, symmetric, unit_diagonal):
+    dev = qml.device("default.qubit", wires=n_wires)
+    _worker['kernel'] = qml.QNode(circuit, dev)
+    _worker['out'] = out
+    _worker['A'] = A
+    _worker['B'] = B
+    _worker['symmetric'] = symmetric
+    _worker['unit_diagonal'] = unit_diagonal
+
+def _evaluate_tile(tile):
+    """Evaluate the entries of one tile and write them to shared memory."""
+    i_start, i_stop, j_start, j_stop = tile
+    kernel = _worker['kernel']
+    A = _worker['A']
+    B = _worker['B']
+    out = _worker['out']
+    if not _worker['symmetric']:
+        for i in range(i_start, i_stop):
+            for j in range(j_start, j_stop):
+                out[i, j] = kernel(A[i], B[j])
+        return tile
+    #Symmetric mode: out is the packed upper triangle followed by the diagonal
+    n = len(A)
+    for i in range(i_start, i_stop):
+        for j in range(max(j_start, i + 1), j_stop):
+            out[i*n - i*(i+1)//2 + (j - i - 1)] = kernel(A[i], A[j])
+        if j_start <= i < j_stop and not _worker['unit_diagonal']:
+            out[n*(n-1)//2 + i] = kernel(A[i], A[i])
+    return tile
+
+def tiles(n_rows, n_cols, tile_size, symmetric=False):
+    """Split a n_rows x n_cols matrix into tiles (i_start, i_stop, j_start, j_stop).
+       In symmetric mode only the tiles touching the upper triangle are kept."""
+    result = []
+    for i in range(0, n_rows, tile_size):
+        for j in range(i if symmetric else 0, n_cols, tile_size):
+            result.append((i, min(i + tile_size, n_rows), j, min(j + tile_size, n_cols)))
+    return result
+
+def kernel_matrix_parallel(A, B, kernel_function, n_workers=None, tile_size=16, unit_diagonal=True):
+    """Compute the matrix whose entries are the kernel evaluated on pairwise
+       data from sets A and B with n_workers processes (all cores if None).
+       The result is identical to the serial evaluation. If B is A only the
+       upper triangle is evaluated and a PackedKernelMatrix is returned."""
+    #Decided before converting, np.asarray of a list is a new object
+    symmetric = B is A
+    A = np.asarray(A)
+    B = A if symmetric else np.asarray(B)
+    n = len(A)
+    if symmetric:
+        shape = (n*(n-1)//2 + n,)
+    else:
+        shape = (n, len(B))
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)), 1)*8)
+    try:
+        out = np.ndarray(shape, dtype=float, buffer=shm.buf)
+        out[:] = 1.0
+        n_wires = len(kernel_function.device.wires)
+        #Fork, so the workers inherit the kernel circuit, its globals and the
+        #mapping of the shared output array without pickling any of them
+        context = multiprocessing.get_context("fork")
+        initargs = (kernel_function.func, n_wires, A, B, out, symmetric, unit_diagonal)
+        with context.Pool(n_workers, initializer=_init_worker, initargs=initargs) as pool:
+            for _ in pool.imap_unordered(_evaluate_tile, tiles(n, len(B), tile_size, symmetric)):
+                pass
+        result = np.array(out)
+        del out
+    finally:
+        shm.close()
+        shm.unlink()
+    if symmetric:
+        diagonal = 1.0 if unit_diagonal else result[n*(n-1)//2:]
+        return PackedKernelMatrix(n, result[:n*(n-1)//2], diagonal)
+    return result
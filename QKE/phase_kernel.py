@@ -0,0 +1,79 @@
+import math
+import numpy as np
+from kernel_states import gram_from_states, precision_dtypes
+from packed_kernel import packed_gram_from_states
+
+#ZZ, Z and IQP feature maps are layers of Hadamards followed by gates that
+#are diagonal in the computational basis. Every layer multiplies the state by
+#exp(i*phase(x, z)) for the basis states z, so the statevectors of a batch of
+#samples are computed with vectorized phase vectors and a fast Walsh-Hadamard
+#transform for the Hadamard layers, instead of simulating gate by gate.
+#Global phases are dropped since they do not change the kernel.
+
+def entangled_pairs(n_qubits, entanglement='linear'):
+    """Pairs of qubits with a ZZ interaction. entanglement is 'linear',
+       'circular', 'full' or an explicit list of pairs."""
+    if entanglement == 'linear':
+        return [(i, i + 1) for i in range(n_qubits - 1)]
+    if entanglement == 'circular':
+        pairs = entangled_pairs(n_qubits, 'linear')
+        return pairs + [(n_qubits - 1, 0)] if n_qubits > 2 else pairs
+    if entanglement == 'full':
+        return [(i, j) for i in range(n_qubits) for j in range(i + 1, n_qubits)]
+    return list(entanglement)
+
+#Angle of the single qubit and the two qubit phase gates for every feature map
+#'zz': Qiskit ZZFeatureMap and kernel_zz, P(2x_i) and P(2(pi - x_i)(pi - x_j))
+#'z': Qiskit ZFeatureMap, P(2x_i)
+#'iqp': PennyLane IQPEmbedding, RZ(x_i) and MultiRZ(x_i x_j)
+feature_maps = {
+    'zz': (lambda x: 2*x, lambda x_i, x_j: 2*(math.pi - x_i)*(math.pi - x_j)),
+    'z': (lambda x: 2*x, None),
+    'iqp': (lambda x: x, lambda x_i, x_j: x_i*x_j),
+}
+
+def walsh_hadamard(states):
+    """Apply a Hadamard on every qubit to a batch of statevectors of shape
+       (n_states, 2**n_qubits) with a fast Walsh-Hadamard transform."""
+    states = np.array(states, dtype=np.result_type(states, np.complex64))
+    n_states, dim = states.shape
+    h = 1
+    while h < dim:
+        view = states.reshape(n_states, dim//(2*h), 2, h)
+        first = view[:, :, 0, :].copy()
+        view[:, :, 0, :] += view[:, :, 1, :]
+        view[:, :, 1, :] = first - view[:, :, 1, :]
+        h *= 2
+    return states/math.sqrt(dim)
+
+def phase_vectors(samples, map_type='zz', entanglement='linear'):
+    """Phase of every computational basis state for every sample, shape
+       (n_samples, 2**n_qubits). Qubit i is bit i of the basis state."""
+    samples = np.asarray(samples, dtype=float)
+    n_qubits = samples.shape[1]
+    single, pair = feature_maps[map_type]
+    bits = (np.arange(2**n_qubits)[:, None] >> np.arange(n_qubits)) & 1
+    phases = single(samples) @ bits.T
+    if pair is not None:
+        for i, j in entangled_pairs(n_qubits, entanglement):
+            parity = bits[:, i] ^ bits[:, j]
+            phases += np.outer(pair(samples[:, i], samples[:, j]), parity)
+    return phases
+
+def phase_states(samples, reps=1, entanglement='linear', map_type='zz', precision='float64'):
+    """Statevectors of the feature map for a batch of samples. The phases
+       are computed in double precision and stored in the given precision."""
+    phases = np.exp(1j*phase_vectors(samples, map_type, entanglement)).astype(precision_dtypes[precision][0])
+    #The first Hadamard layer maps |0> to the uniform superposition
+    states = phases/math.sqrt(phases.shape[1])
+    for rep in range(reps - 1):
+        states = walsh_hadamard(states)*phases
+    return states
+
+def phase_kernel_matrix(A, B, reps=1, entanglement='linear', map_type='zz', conjugate=True, precision='float64'):
+    """Kernel matrix of the feature map between the sets A and B. If B is
+       A a PackedKernelMatrix of the upper triangle is returned."""
+    states_A = phase_states(A, reps, entanglement, map_type, precision)
+    if B is A:
+        return packed_gram_from_states(states_A, conjugate)
+    return gram_from_states(states_A, phase_states(B, reps, entanglement, map_type, precision), conjugate)
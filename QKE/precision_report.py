@@ -0,0 +1,51 @@
+import numpy as np
+import QKE_PennyLane
+from QKE_PennyLane import *
+
+#Validation of the single precision mode: the kernel matrices of every
+#kernel are computed in 'float64' and 'float32' on the iris, breast cancer
+#and ad hoc datasets, and the SVM accuracy on the test set is compared.
+#SVC(kernel='precomputed') converts the kernel matrix to float64 when
+#fitting, the memory is halved in the simulation, the stored and cached
+#kernel matrices, and streamed or memory-mapped test kernel matrices.
+
+def load_datasets():
+    """Train and test sets with n_features attributes scaled to (-1, 1)."""
+    datasets = {}
+    datasets['iris'] = load_data_iris(150, n_classes=3)
+    [sample_train, sample_test, label_train, label_test] = load_data_breast(n_features, 500)
+    [sample_train, sample_test] = reduceAttributeDimensions(n_features, sample_train, sample_test)
+    datasets['breast cancer'] = [sample_train, sample_test, label_train, label_test]
+    #The ad hoc data has at most 3 attributes, the missing ones are 0
+    [sample_train, sample_test, label_train, label_test] = load_data_adhoc(150, 3)
+    padding = ((0, 0), (0, n_features - 3))
+    datasets['ad hoc'] = [np.pad(sample_train, padding), np.pad(sample_test, padding), label_train, label_test]
+    for name, [sample_train, sample_test, label_train, label_test] in datasets.items():
+        [sample_train, sample_test] = scale(np.asarray(sample_train), np.asarray(sample_test), -1, 1)
+        datasets[name] = [sample_train, sample_test, label_train, label_test]
+    return datasets
+
+def evaluate(data, kernel_function, precision):
+    """Kernel matrices and test accuracy in the given precision."""
+    QKE_PennyLane.kernel_precision = precision
+    [sample_train, sample_test, label_train, label_test] = data
+    [matrix_train, matrix_test] = kernel_matrices(sample_train, sample_test, kernel_function)
+    matrix_train = np.asarray(matrix_train)
+    score = SVC(kernel='precomputed').fit(matrix_train, label_train).score(matrix_test, label_test)
+    return matrix_train, matrix_test, score
+
+def main():
+    kernel_functions = [kernel_angle, kernel_IQP, kernel_zz, kernel_angle_homemade]
+    for name, data in load_datasets().items():
+        print("%s, %d training samples" % (name, len(data[0])))
+        for kernel_function in kernel_functions:
+            [train_64, test_64, score_64] = evaluate(data, kernel_function, 'float64')
+            [train_32, test_32, score_32] = evaluate(data, kernel_function, 'float32')
+            error = max(np.abs(train_32 - train_64).max(), np.abs(test_32 - test_64).max())
+            print("%s: accuracy %0.3f (float64), %0.3f (float32), delta %+0.3f, max kernel error %0.1e, %d -> %d bytes"
+                  % (kernel_function.__name__, score_64, score_32, score_32 - score_64, error, train_64.nbytes, train_32.nbytes))
+        print()
+    QKE_PennyLane.kernel_precision = 'float64'
+
+if __name__ == '__main__':
+    main()
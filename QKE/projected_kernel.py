@@ -0,0 +1,55 @@
+import numpy as np
+import pennylane as qml
+from kernel_states import precision_dtypes
+
+#Fidelity kernels compare the full embedded states, so their values
+#concentrate towards 0 as the amount of qubits grows, and every pair of
+#samples needs its own circuit. The projected kernel (Huang et al., Nature
+#Communications 12, 2631) only compares the single qubit reduced density
+#matrices rho_q(x), which are given by the Pauli expectations <X>, <Y>, <Z>
+#of every qubit:
+#    k(x, y) = exp(-gamma sum_q |rho_q(x) - rho_q(y)|_F^2)
+#            = exp(-gamma/2 sum_q |v_q(x) - v_q(y)|^2)
+#Every sample is embedded once and stored as 3 values per qubit, and the
+#kernel of all pairs is one vectorized distance computation.
+
+def pauli_expectations(states):
+    """Expectations of X, Y and Z on every qubit of the statevectors,
+       shape (n_samples, n_qubits, 3). Qubit 0 is the most significant."""
+    states = np.asarray(states)
+    n_samples = len(states)
+    n_qubits = int(np.log2(states.shape[1]))
+    expectations = np.empty((n_samples, n_qubits, 3))
+    for q in range(n_qubits):
+        amplitudes = states.reshape(n_samples, 2**q, 2, -1)
+        #Reduced density matrix of qubit q
+        rho = np.einsum('nais,najs->nij', amplitudes, np.conj(amplitudes))
+        expectations[:, q, 0] = 2*rho[:, 0, 1].real
+        expectations[:, q, 1] = -2*rho[:, 0, 1].imag
+        expectations[:, q, 2] = (rho[:, 0, 0] - rho[:, 1, 1]).real
+    return expectations
+
+def measured_pauli_expectations(samples, embedding, wires, device=None):
+    """Expectations of X, Y and Z on every wire after embedding(x), one
+       circuit per sample, shape (n_samples, n_qubits, 3). Works with
+       shots and on hardware devices."""
+    wires = list(wires)
+    if device is None:
+        device = qml.device("default.qubit", wires=wires)
+
+    @qml.qnode(device)
+    def circuit(x):
+        embedding(x)
+        return [qml.expval(pauli(wire)) for wire in wires for pauli in (qml.PauliX, qml.PauliY, qml.PauliZ)]
+
+    expectations = np.array([np.asarray(circuit(x)) for x in samples])
+    return expectations.reshape(len(samples), len(wires), 3)
+
+def projected_kernel_matrix(features_A, features_B, gamma=1.0, precision='float64'):
+    """Projected kernel matrix between two sets of Pauli expectations, in
+       the given precision."""
+    dtype = precision_dtypes[precision][1]
+    A = np.asarray(features_A, dtype=dtype).reshape(len(features_A), -1)
+    B = np.asarray(features_B, dtype=dtype).reshape(len(features_B), -1)
+    distances = np.sum(A**2, axis=1)[:, None] + np.sum(B**2, axis=1)[None, :] - 2*A @ B.T
+    return np.exp(-gamma/2*np.maximum(distances, 0))
@@ -0,0 +1,106 @@
+import numpy as np
+from qiskit import QuantumCircuit, transpile
+from qiskit.circuit import ParameterVector
+from qiskit.circuit.library import ZZFeatureMap, ZFeatureMap
+from qiskit.quantum_info import Statevector
+from kernel_states import gram_from_states
+from packed_kernel import PackedKernelMatrix, packed_gram_from_states
+
+#Kernel circuits for the Qiskit feature maps. The parameterized circuit
+#U(x)U^dagger(y) is built and transpiled once per backend and cached, and
+#the samples are bound to it in batches that are submitted together. On a
+#statevector simulator the kernel is computed from one statevector per
+#sample instead of one circuit per pair.
+
+#Cached circuits by (map type, dimension, reps, entanglement) and backend
+_feature_maps = {}
+_transpiled = {}
+
+def backend_name(backend):
+    name = backend.name
+    return name() if callable(name) else name
+
+def feature_map(map_type, feature_dimension, reps, entanglement='linear'):
+    """Parameterized feature map and its parameter vector x."""
+    key = (map_type, feature_dimension, reps, entanglement)
+    if key not in _feature_maps:
+        if map_type == 'zz':
+            map = ZZFeatureMap(feature_dimension, reps, entanglement=entanglement, insert_barriers=True)
+        else:
+            #map = PauliFeatureMap(feature_dimension, reps=reps, paulis=['Z', 'Y', 'ZZ'])
+            #map = RealAmplitudes(feature_dimension, entanglement="full", reps=2, insert_barriers=True)
+            map = ZFeatureMap(feature_dimension, reps, insert_barriers=True)
+        x = ParameterVector('x', feature_dimension)
+        _feature_maps[key] = (map.assign_parameters(x), x)
+    return _feature_maps[key]
+
+def kernel_circuit(map_type, feature_dimension, reps, entanglement='linear'):
+    """Parameterized kernel circuit U(x)U^dagger(y) with measurements,
+       and its parameter vectors x and y."""
+    map, x = feature_map(map_type, feature_dimension, reps, entanglement)
+    y = ParameterVector('y', feature_dimension)
+    circuit = QuantumCircuit(feature_dimension)
+    circuit.compose(map, inplace=True)
+    circuit.compose(map.assign_parameters(dict(zip(x, y))).inverse(), inplace=True)
+    circuit.measure_all()
+    return circuit, x, y
+
+def transpiled_kernel_circuit(map_type, feature_dimension, reps, entanglement, backend):
+    """Kernel circuit transpiled for the backend, transpiled only once."""
+    key = (map_type, feature_dimension, reps, entanglement, backend_name(backend))
+    if key not in _transpiled:
+        circuit, x, y = kernel_circuit(map_type, feature_dimension, reps, entanglement)
+        _transpiled[key] = (transpile(circuit, backend, seed_transpiler=1024), x, y)
+    return _transpiled[key]
+
+def bind_kernel_circuits(circuit, x, y, pairs):
+    """Bind every pair (a, b) of samples to the kernel circuit."""
+    return [circuit.assign_parameters(dict(zip(x, a)) | dict(zip(y, b))) for a, b in pairs]
+
+def max_batch_size(backend):
+    """Amount of circuits the backend accepts in one job."""
+    if hasattr(backend, 'max_circuits') and backend.max_circuits is not None:
+        return backend.max_circuits
+    if hasattr(backend, 'configuration'):
+        return getattr(backend.configuration(), 'max_experiments', 300)
+    return 300
+
+def feature_map_states(samples, map_type, feature_dimension, reps, entanglement='linear'):
+    """Statevector of the feature map for every sample."""
+    map, x = feature_map(map_type, feature_dimension, reps, entanglement)
+    return np.array([Statevector(map.assign_parameters(dict(zip(x, sample)))).data for sample in samples])
+
+def kernel_matrix_qiskit(A, B, map_type, feature_dimension, reps, entanglement, backend, shots=1024, batch_size=None):
+    """Compute the kernel matrix between the sets A and B on the backend.
+       If B is A only the strict upper triangle is run and a
+       PackedKernelMatrix is returned."""
+    symmetric = B is A
+    if 'statevector' in backend_name(backend):
+        states_A = feature_map_states(A, map_type, feature_dimension, reps, entanglement)
+        if symmetric:
+            return packed_gram_from_states(states_A)
+        return gram_from_states(states_A, feature_map_states(B, map_type, feature_dimension, reps, entanglement))
+
+    if symmetric:
+        rows, cols = np.triu_indices(len(A), k=1)
+    else:
+        rows, cols = np.indices((len(A), len(B))).reshape(2, -1)
+    counts = zero_counts(A, B, rows, cols, map_type, feature_dimension, reps, entanglement, backend, shots, batch_size)
+    values = counts/shots
+    if symmetric:
+        return PackedKernelMatrix(len(A), values)
+    return values.reshape(len(A), len(B))
+
+def zero_counts(A, B, rows, cols, map_type, feature_dimension, reps, entanglement, backend, shots=1024, batch_size=None):
+    """Run the kernel circuits of the pairs (A[rows[k]], B[cols[k]]) with
+       the given amount of shots, and count the all zero outcomes."""
+    circuit, x, y = transpiled_kernel_circuit(map_type, feature_dimension, reps, entanglement, backend)
+    batch_size = batch_size or max_batch_size(backend)
+    zeros = '0'*feature_dimension
+    counts = np.empty(len(rows), dtype=int)
+    for start in range(0, len(rows), batch_size):
+        pairs = [(A[i], B[j]) for i, j in zip(rows[start:start + batch_size], cols[start:start + batch_size])]
+        result = backend.run(bind_kernel_circuits(circuit, x, y, pairs), shots=shots).result()
+        for k in range(len(pairs)):
+            counts[start + k] = result.get_counts(k).get(zeros, 0)
+    return counts
@@ -0,0 +1,59 @@
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.svm import SVC
+
+#A precomputed kernel SVC only uses the kernel between a new sample and the
+#support vectors, all other training samples have a dual coefficient of 0.
+#This classifier keeps the support vectors after fitting and evaluates the
+#quantum kernel of new samples against them only. With prepare, for example
+#the statevectors of a state based kernel, the support vectors are prepared
+#once when fitting.
+
+class SupportVectorQSVC(BaseEstimator, ClassifierMixin):
+    """SVC with a quantum kernel, where kernel(A, B) computes the kernel
+       matrix between the sets A and B. If prepare is given, kernel(A, B)
+       takes the prepared sets prepare(A) and prepare(B)."""
+
+    def __init__(self, kernel, C=1.0, chunk_size=1000, prepare=None):
+        self.kernel = kernel
+        self.C = C
+        self.chunk_size = chunk_size
+        self.prepare = prepare
+
+    def _prepare(self, samples):
+        return samples if self.prepare is None else self.prepare(samples)
+
+    def fit(self, samples, labels, matrix_train=None):
+        """Fit the SVC, reusing matrix_train if the training kernel
+           matrix has already been computed."""
+        samples = np.asarray(samples)
+        if matrix_train is None:
+            prepared = self._prepare(samples)
+            matrix_train = self.kernel(prepared, prepared)
+        self.svc_ = SVC(kernel='precomputed', C=self.C).fit(matrix_train, labels)
+        self.classes_ = self.svc_.classes_
+        self.support_ = self.svc_.support_
+        self.support_vectors_ = samples[self.support_]
+        self.prepared_support_vectors_ = self._prepare(self.support_vectors_)
+        self.n_train_ = len(samples)
+        self.support_fraction_ = len(self.support_)/self.n_train_
+        return self
+
+    def support_kernel_matrix(self, samples):
+        """Kernel matrix of the samples against the training samples, where
+           only the columns of the support vectors are evaluated."""
+        matrix = np.zeros((len(samples), self.n_train_))
+        matrix[:, self.support_] = np.asarray(self.kernel(self._prepare(samples), self.prepared_support_vectors_))
+        return matrix
+
+    def _chunked(self, method, samples):
+        samples = np.asarray(samples)
+        results = [method(self.support_kernel_matrix(samples[start:start + self.chunk_size]))
+                   for start in range(0, len(samples), self.chunk_size)]
+        return np.concatenate(results)
+
+    def decision_function(self, samples):
+        return self._chunked(self.svc_.decision_function, samples)
+
+    def predict(self, samples):
+        return self._chunked(self.svc_.predict, samples)
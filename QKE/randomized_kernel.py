@@ -0,0 +1,75 @@
+import numpy as np
+import pennylane as qml
+
+#Fidelity kernel estimated from randomized measurements. Every sample runs
+#only its embedding circuit, followed by random single qubit unitaries that
+#are shared by all samples, and is measured in the computational basis. The
+#overlap of two states follows from the cross-correlation of their measured
+#distributions (Elben et al., PRL 124, 010504):
+#    tr(rho_a rho_b) = 2^n E_u[sum_{s,s'} (-2)^(-D(s,s')) P_u(s|a) P_u(s'|b)]
+#where D is the Hamming distance. This needs n_bases circuits per sample
+#instead of one circuit per pair of samples.
+
+def random_bases(n_bases, n_qubits, seed=None):
+    """Euler angles (phi, theta, omega) of Haar random single qubit
+       unitaries, shape (n_bases, n_qubits, 3)."""
+    rng = np.random.default_rng(seed)
+    phi = rng.uniform(0, 2*np.pi, (n_bases, n_qubits))
+    omega = rng.uniform(0, 2*np.pi, (n_bases, n_qubits))
+    theta = np.arccos(1 - 2*rng.uniform(0, 1, (n_bases, n_qubits)))
+    return np.stack((phi, theta, omega), axis=2)
+
+def randomized_probabilities(samples, embedding, wires, bases, shots=1000, device=None):
+    """Measured distribution of every sample in every random basis, shape
+       (n_bases, n_samples, 2**n_qubits). embedding(x) applies the
+       embedding circuit of the sample x on the wires."""
+    if device is None:
+        device = qml.device("default.qubit", wires=wires)
+
+    def circuit(x, angles):
+        embedding(x)
+        for i, wire in enumerate(wires):
+            qml.Rot(angles[i, 0], angles[i, 1], angles[i, 2], wires=wire)
+        return qml.probs(wires=wires)
+
+    qnode = qml.set_shots(qml.QNode(circuit, device), shots=shots)
+    return np.array([[qnode(x, angles) for x in samples] for angles in bases])
+
+def cross_correlation(probabilities):
+    """Apply (-2)^(-D(s,s')) to distributions over n qubit bit strings,
+       one qubit at a time since the matrix is a tensor product."""
+    n_qubits = int(np.log2(probabilities.shape[-1]))
+    factor = np.array([[1.0, -0.5], [-0.5, 1.0]])
+    shape = probabilities.shape
+    result = probabilities.reshape(shape[:-1] + (2,)*n_qubits)
+    for qubit in range(n_qubits):
+        axis = len(shape) - 1 + qubit
+        result = np.moveaxis(np.tensordot(result, factor, axes=([axis], [0])), -1, axis)
+    return result.reshape(shape)
+
+def randomized_kernel_matrix(probabilities_A, probabilities_B=None):
+    """Estimate the fidelity kernel matrix from randomized measurements of
+       the sets A and B, measured in the same bases. Without B the kernel
+       matrix of A with itself is estimated and its diagonal set to 1."""
+    symmetric = probabilities_B is None
+    if symmetric:
+        probabilities_B = probabilities_A
+    dim = probabilities_A.shape[-1]
+    correlated = cross_correlation(probabilities_A)
+    #Average over the bases of the correlation of every pair of samples
+    matrix = dim*np.einsum('uas,ubs->ab', correlated, probabilities_B)/len(probabilities_A)
+    if symmetric:
+        #The same measurements can not estimate the overlap of a state with itself
+        #without bias, but the embedded states are pure
+        np.fill_diagonal(matrix, 1.0)
+    return matrix
+
+def randomized_kernel_matrices(sample_train, sample_test, embedding, wires, n_bases=50, shots=1000, device=None, seed=None):
+    """Estimate the train and test kernel matrices, with n_bases random
+       bases and shots measurements per sample and basis."""
+    bases = random_bases(n_bases, len(wires), seed)
+    probabilities_train = randomized_probabilities(sample_train, embedding, wires, bases, shots, device)
+    probabilities_test = randomized_probabilities(sample_test, embedding, wires, bases, shots, device)
+    matrix_train = randomized_kernel_matrix(probabilities_train)
+    matrix_test = randomized_kernel_matrix(probabilities_test, probabilities_train)
+    return matrix_train, matrix_test
@@ -0,0 +1,53 @@
+import numpy as np
+
+#Prediction with a precomputed kernel SVC without materializing the full
+#test kernel matrix. The kernel between the test samples and the training
+#samples is evaluated a chunk of rows at a time, passed on to the SVC and
+#dropped, so the memory is bounded by the chunk size. The chunks can
+#optionally be spilled to a memory-mapped .npy file on disk.
+#Kernels with a per sample part, like the statevectors of state based
+#kernels, pass it as prepare: the training samples are prepared once and
+#every chunk only computes its own part and the block against them.
+
+def kernel_chunks(kernel, samples, sample_train, chunk_size=1000, spill_path=None, prepare=None):
+    """Yield (start, kernel matrix chunk) for consecutive row chunks of the
+       samples against the training samples, where kernel(A, B) computes
+       the kernel matrix between the sets A and B. If prepare is given,
+       kernel(A, B) takes the prepared sets prepare(A) and prepare(B)."""
+    n = len(samples)
+    spill = None
+    if prepare is None:
+        prepare = lambda X: X
+    prepared_train = prepare(sample_train)
+    for start in range(0, n, chunk_size):
+        chunk = np.asarray(kernel(prepare(samples[start:start + chunk_size]), prepared_train))
+        if spill_path is not None and spill is None:
+            #The spill file has the precision of the kernel matrix
+            spill = np.lib.format.open_memmap(spill_path, mode='w+', dtype=chunk.dtype, shape=(n, len(sample_train)))
+        if spill is not None:
+            spill[start:start + len(chunk)] = chunk
+        yield start, chunk
+    if spill is not None:
+        spill.flush()
+
+def decision_function_streaming(svc, kernel, samples, sample_train, chunk_size=1000, spill_path=None, prepare=None):
+    """Decision function of a precomputed kernel SVC on the samples."""
+    decisions = None
+    for start, chunk in kernel_chunks(kernel, samples, sample_train, chunk_size, spill_path, prepare):
+        values = svc.decision_function(chunk)
+        if decisions is None:
+            decisions = np.empty((len(samples),) + values.shape[1:])
+        decisions[start:start + len(values)] = values
+    return decisions
+
+def predict_streaming(svc, kernel, samples, sample_train, chunk_size=1000, spill_path=None, prepare=None):
+    """Predicted labels of a precomputed kernel SVC on the samples."""
+    predictions = np.empty(len(samples), dtype=svc.classes_.dtype)
+    for start, chunk in kernel_chunks(kernel, samples, sample_train, chunk_size, spill_path, prepare):
+        predictions[start:start + len(chunk)] = svc.predict(chunk)
+    return predictions
+
+def score_streaming(svc, kernel, samples, labels, sample_train, chunk_size=1000, spill_path=None, prepare=None):
+    """Accuracy of a precomputed kernel SVC on the samples."""
+    predictions = predict_streaming(svc, kernel, samples, sample_train, chunk_size, spill_path, prepare)
+    return np.mean(predictions == np.asarray(labels))
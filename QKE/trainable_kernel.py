@@ -0,0 +1,90 @@
+import pennylane as qml
+from pennylane import numpy as pnp
+import numpy as np
+
+#Fidelity kernel with a trainable embedding, trained by maximizing the
+#kernel target alignment (Hubregtsen et al., PRA 106, 042431). Every step
+#estimates the alignment and its gradient on a random subset of the
+#training samples, running the kernel circuits of all pairs of the subset
+#as one broadcasted execution, so a step costs the same for any size of
+#the training set. The trained kernel matrix is built from one statevector
+#per sample.
+
+def trainable_embedding(x, params, wires):
+    """Layers of Hadamards, RZ rotations of the features scaled by
+       params[l, 0], trainable RY rotations params[l, 1] and a ring of
+       trainable CRZ rotations params[l, 2]. x can be a batch of samples."""
+    n = len(wires)
+    for layer in params:
+        for i, wire in enumerate(wires):
+            qml.Hadamard(wires=wire)
+            qml.RZ(layer[0, i]*x[..., i], wires=wire)
+            qml.RY(layer[1, i], wires=wire)
+        #Ring of neighbours, a single pair for two qubits
+        for i in range(n if n > 2 else n - 1):
+            qml.CRZ(layer[2, i], wires=[wires[i], wires[(i + 1) % n]])
+
+def target_alignment(upper, labels_i, labels_j, n):
+    """Kernel target alignment <K, yy^T>/(|K| |yy^T|) of the kernel matrix
+       of n samples with a unit diagonal, from its strict upper triangle
+       upper, where the target is 1 for pairs of the same class and -1
+       otherwise."""
+    target = pnp.where(labels_i == labels_j, 1.0, -1.0)
+    inner = n + 2*pnp.sum(upper*target)
+    norm = pnp.sqrt(n + 2*pnp.sum(upper**2))
+    return inner/(norm*n)
+
+class TrainableKernel:
+    """Fidelity kernel of trainable_embedding with the given amount of
+       layers on n_wires qubits."""
+
+    def __init__(self, n_wires, layers=2, device=None, seed=None):
+        self.wires = list(range(n_wires))
+        self.rng = np.random.default_rng(seed)
+        params = self.rng.uniform(0, 2*np.pi, (layers, 3, n_wires))
+        #Start with unscaled features
+        params[:, 0] = 1
+        self.params = pnp.array(params, requires_grad=True)
+        if device is None:
+            device = qml.device("default.qubit", wires=n_wires)
+
+        def kernel_circuit(x, y, params):
+            trainable_embedding(x, params, self.wires)
+            qml.adjoint(trainable_embedding)(y, params, self.wires)
+            return qml.probs(wires=self.wires)
+
+        def state_circuit(x, params):
+            trainable_embedding(x, params, self.wires)
+            return qml.state()
+
+        self.kernel_qnode = qml.QNode(kernel_circuit, device)
+        self.state_qnode = qml.QNode(state_circuit, device)
+
+    def pair_kernel(self, x, y, params=None):
+        """Kernel of the pairs (x[k], y[k]), all run in one execution."""
+        params = self.params if params is None else params
+        return self.kernel_qnode(x, y, params)[..., 0]
+
+    def batch_alignment(self, samples, labels, params=None):
+        """Kernel target alignment of the kernel matrix of the samples."""
+        rows, cols = np.triu_indices(len(samples), k=1)
+        upper = self.pair_kernel(samples[rows], samples[cols], params)
+        return target_alignment(upper, labels[rows], labels[cols], len(samples))
+
+    def fit(self, samples, labels, steps=100, batch_size=8, step_size=0.1):
+        """Maximize the alignment with Adam, on batch_size random samples
+           per step. Returns the alignment of every step."""
+        samples = pnp.array(samples, requires_grad=False)
+        labels = np.asarray(labels)
+        optimizer = qml.AdamOptimizer(step_size)
+        history = []
+        for step in range(steps):
+            batch = self.rng.choice(len(samples), batch_size, replace=False)
+            cost = lambda params: -self.batch_alignment(samples[batch], labels[batch], params)
+            self.params, loss = optimizer.step_and_cost(cost, self.params)
+            history.append(-float(loss))
+        return history
+
+    def states(self, samples):
+        """Statevector of the embedding for every sample."""
+        return np.asarray(self.state_qnode(pnp.array(samples, requires_grad=False), self.params), dtype=complex)